@@ -1,64 +1,81 @@
 from tree_sitter_languages import get_language, get_parser
-import os
+from analyzer.metrics import count_lines, tree_sitter_function_metrics
+from analyzer.clones import tree_sitter_tokens, shingle_hashes
+from analyzer.summary import header_comment, record_doc
+from analyzer.limits import parse_source, check_depth, analyze_files
 
 # Initialize the C language and parser
 C_LANGUAGE = get_language('c')
 parser = get_parser('c')
 
-def analyze_c_project(project_path):
+def empty_c_analysis(loc=0):
+    """Return a C file analysis with no elements; it also stands in for files that fail to analyze."""
+    return {
+        'structs': [],
+        'functions': [],
+        'includes': [],
+        'global_vars': [],
+        'function_metrics': [],
+        'clone_shingles': [],
+        'docs': [],
+        'loc': loc
+    }
+
+def analyze_c_file(code):
+    """Analyze the source of a single C file and return a dictionary with structs, functions, includes, and global variables."""
+    tree = parse_source(parser, code)
+    file_analysis = empty_c_analysis(count_lines(code))
+    root_node = tree.root_node
+    header = header_comment(root_node, code)
+    if header:
+        file_analysis['docs'].append(header)
+    # Extract includes
+    for node in root_node.children:
+        if node.type == 'preproc_include':
+            include_name_node = node.child_by_field_name('path')
+            if include_name_node:
+                include_name = code[include_name_node.start_byte:include_name_node.end_byte].strip("'\"<>")
+                if include_name not in file_analysis['includes']:
+                    file_analysis['includes'].append(include_name)
+    # Extract structs, functions, and global variables
+    def traverse(node, depth=0):
+        check_depth(depth)
+        if node.type in ('struct_specifier', 'union_specifier'):
+            name_node = node.child_by_field_name('name')
+            if name_node:
+                struct_name = code[name_node.start_byte:name_node.end_byte]
+                file_analysis['structs'].append(struct_name)
+        elif node.type == 'function_definition':
+            declarator_node = node.child_by_field_name('declarator')
+            if declarator_node:
+                func_name_node = declarator_node.child_by_field_name('declarator')
+                if func_name_node and func_name_node.type == 'identifier':
+                    func_name = code[func_name_node.start_byte:func_name_node.end_byte]
+                    file_analysis['functions'].append(func_name)
+                    record_doc(file_analysis['docs'], node, code, func_name)
+                    file_analysis['function_metrics'].append(tree_sitter_function_metrics(
+                        node, func_name, 'c', code, declarator_node.child_by_field_name('parameters')))
+                    file_analysis['clone_shingles'].append(shingle_hashes(tree_sitter_tokens(node)))
+        elif node.type == 'declaration' and node.parent.type == 'translation_unit':
+            declarator_node = node.child_by_field_name('declarator')
+            if declarator_node and declarator_node.type == 'init_declarator':
+                var_name_node = declarator_node.child_by_field_name('declarator')
+                if var_name_node and var_name_node.type == 'identifier':
+                    var_name = code[var_name_node.start_byte:var_name_node.end_byte]
+                    file_analysis['global_vars'].append(var_name)
+        for child in node.children:
+            traverse(child, depth + 1)
+    traverse(root_node)
+    return file_analysis
+
+def analyze_c_project(project_path, should_stop=None):
     """Analyze a C project and return a dictionary with structs, functions, includes, and global variables."""
-    analysis = {}
-    for root, _, files in os.walk(project_path):
-        for file in files:
-            if file.endswith(('.c', '.h')):
-                file_path = os.path.join(root, file)
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    code = f.read()
-                tree = parser.parse(bytes(code, 'utf-8'))
-                analysis[file_path] = {
-                    'structs': [],
-                    'functions': [],
-                    'includes': [],
-                    'global_vars': []
-                }
-                root_node = tree.root_node
-                # Extract includes
-                for node in root_node.children:
-                    if node.type == 'preproc_include':
-                        include_name_node = node.child_by_field_name('path')
-                        if include_name_node:
-                            include_name = code[include_name_node.start_byte:include_name_node.end_byte].strip("'\"<>")
-                            if include_name not in analysis[file_path]['includes']:
-                                analysis[file_path]['includes'].append(include_name)
-                # Extract structs, functions, and global variables
-                def traverse(node):
-                    if node.type in ('struct_specifier', 'union_specifier'):
-                        name_node = node.child_by_field_name('name')
-                        if name_node:
-                            struct_name = code[name_node.start_byte:name_node.end_byte]
-                            analysis[file_path]['structs'].append(struct_name)
-                    elif node.type == 'function_definition':
-                        declarator_node = node.child_by_field_name('declarator')
-                        if declarator_node:
-                            func_name_node = declarator_node.child_by_field_name('declarator')
-                            if func_name_node and func_name_node.type == 'identifier':
-                                func_name = code[func_name_node.start_byte:func_name_node.end_byte]
-                                analysis[file_path]['functions'].append(func_name)
-                    elif node.type == 'declaration' and node.parent.type == 'translation_unit':
-                        declarator_node = node.child_by_field_name('declarator')
-                        if declarator_node and declarator_node.type == 'init_declarator':
-                            var_name_node = declarator_node.child_by_field_name('declarator')
-                            if var_name_node and var_name_node.type == 'identifier':
-                                var_name = code[var_name_node.start_byte:var_name_node.end_byte]
-                                analysis[file_path]['global_vars'].append(var_name)
-                    for child in node.children:
-                        traverse(child)
-                traverse(root_node)
-    return analysis
+    return analyze_files(project_path, ('.c', '.h'), analyze_c_file, empty_c_analysis, should_stop)
 
-def explain_c_code(project_path):
+def explain_c_code(project_path, analysis=None):
     """Generate a summary of the C project structure based on the current analysis."""
-    analysis = analyze_c_project(project_path)
+    if analysis is None:
+        analysis = analyze_c_project(project_path)
     total_structs = sum(len(data['structs']) for data in analysis.values())
     total_functions = sum(len(data['functions']) for data in analysis.values())
     total_includes = set(inc for data in analysis.values() for inc in data['includes'])
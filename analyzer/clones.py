@@ -0,0 +1,199 @@
+import ast
+import os
+import zlib
+from functools import lru_cache
+import numpy as np
+
+SHINGLE_SIZE = 5           # Consecutive normalized tokens per shingle
+MIN_TOKENS = 40            # Smaller functions (getters, stubs) are too generic to report as clones
+NUM_PERM = 128             # MinHash permutations per signature
+BANDS = 16                 # LSH bands; NUM_PERM // BANDS rows each, ~0.7 Jaccard candidate threshold
+SIMILARITY_THRESHOLD = 0.8 # Estimated Jaccard similarity needed to link two functions
+BATCH_ELEMENTS = 1 << 23   # Upper bound on shingles * permutations held in memory per MinHash batch
+
+SHINGLE_PRIME = np.uint64(1099511628211)
+HASH_SHIFT = np.uint64(32)
+
+# Named leaf node types that hold identifiers; their text is dropped so renamed copies still match
+IDENTIFIER_TYPES = {
+    'identifier', 'type_identifier', 'field_identifier', 'property_identifier', 'shorthand_property_identifier',
+    'statement_identifier', 'name', 'variable_name', 'scoped_identifier', 'primitive_type',
+}
+LITERAL_MARKERS = ('string', 'number', 'integer', 'float', 'literal', 'char', 'true', 'false', 'null')
+
+
+@lru_cache(maxsize=None)
+def token_id(token):
+    """Stable 32-bit id for a normalized token, identical across processes and hosts."""
+    return zlib.crc32(token.encode('utf-8'))
+
+
+def normalize_leaf(node_type, is_named):
+    """Map a tree-sitter leaf node type to its normalized clone-detection token."""
+    if not is_named:
+        return node_type
+    if 'comment' in node_type:
+        return None
+    if node_type in IDENTIFIER_TYPES or node_type.endswith('identifier'):
+        return 'ID'
+    if any(marker in node_type for marker in LITERAL_MARKERS):
+        return 'LIT'
+    return node_type
+
+
+def tree_sitter_tokens(node):
+    """Return the normalized leaf token sequence of a tree-sitter subtree in source order."""
+    tokens = []
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current.child_count == 0:
+            token = normalize_leaf(current.type, current.is_named)
+            if token is not None:
+                tokens.append(token)
+        else:
+            stack.extend(reversed(current.children))
+    return tokens
+
+
+def python_tokens(node):
+    """Return the pre-order AST node type sequence of a Python function; names and constants are already abstract."""
+    tokens = []
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        tokens.append(type(current).__name__)
+        stack.extend(reversed(list(ast.iter_child_nodes(current))))
+    return tokens
+
+
+def shingle_hashes(tokens, k=SHINGLE_SIZE):
+    """Hash every k-token window of a token sequence into a sorted array of unique uint64 shingles."""
+    if len(tokens) < max(k, MIN_TOKENS):
+        return np.array([], dtype=np.uint64)
+    ids = np.fromiter((token_id(t) for t in tokens), dtype=np.uint64, count=len(tokens))
+    width = ids.size - k + 1
+    hashes = np.zeros(width, dtype=np.uint64)
+    # Polynomial rolling hash; uint64 arithmetic wraps modulo 2**64
+    for j in range(k):
+        hashes = hashes * SHINGLE_PRIME + ids[j:j + width]
+    return np.unique(hashes)
+
+
+def minhash_signatures(shingle_sets, num_perm=NUM_PERM, seed=1, batch_elements=BATCH_ELEMENTS):
+    """Compute MinHash signatures for a list of non-empty shingle arrays, batched with NumPy.
+
+    Uses multiply-shift hashing h(x) = (a * x + b) >> 32 with odd 64-bit multipliers.
+    """
+    n = len(shingle_sets)
+    signatures = np.empty((n, num_perm), dtype=np.uint32)
+    if n == 0:
+        return signatures
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+    sizes = np.fromiter((s.size for s in shingle_sets), dtype=np.int64, count=n)
+    bounds = np.concatenate(([0], np.cumsum(sizes)))
+    max_rows = batch_elements // num_perm
+    start = 0
+    while start < n:
+        # Grow the batch until it would exceed the row budget, but always take at least one function
+        end = int(np.searchsorted(bounds, bounds[start] + max_rows, side='right')) - 1
+        end = min(max(end, start + 1), n)
+        flat = np.concatenate(shingle_sets[start:end])
+        hashed = ((flat[:, None] * a[None, :] + b[None, :]) >> HASH_SHIFT).astype(np.uint32)
+        offsets = bounds[start:end] - bounds[start]
+        signatures[start:end] = np.minimum.reduceat(hashed, offsets, axis=0)
+        start = end
+    return signatures
+
+
+def lsh_candidate_pairs(signatures, bands=BANDS):
+    """Band signatures into LSH buckets and return candidate (i, j) index pairs.
+
+    Members of a bucket are linked to their neighbour in bucket order rather than to every
+    other member, so a bucket of size s yields s - 1 pairs and the whole pass stays near-linear.
+    """
+    n, num_perm = signatures.shape
+    rows = num_perm // bands
+    left = []
+    right = []
+    for band in range(bands):
+        keys = np.zeros(n, dtype=np.uint64)
+        for column in range(band * rows, (band + 1) * rows):
+            keys = keys * SHINGLE_PRIME + signatures[:, column]
+        # Key collisions only add candidates; they are filtered by the similarity check
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        same = sorted_keys[1:] == sorted_keys[:-1]
+        left.append(order[:-1][same])
+        right.append(order[1:][same])
+    if not left:
+        return np.empty((0, 2), dtype=np.int64)
+    pairs = np.stack([np.concatenate(left), np.concatenate(right)], axis=1)
+    pairs.sort(axis=1)
+    return np.unique(pairs, axis=0) if pairs.size else pairs
+
+
+def cluster_pairs(n, pairs):
+    """Union-find over verified pairs; returns a list of index arrays for components of size >= 2."""
+    parent = list(range(n))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for i, j in pairs.tolist():
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+    roots = np.array([find(x) for x in range(n)], dtype=np.int64)
+    order = np.argsort(roots, kind='stable')
+    boundaries = np.flatnonzero(np.diff(roots[order])) + 1
+    return [group for group in np.split(order, boundaries) if group.size > 1]
+
+
+def find_clone_clusters(analysis, project_path=None, threshold=SIMILARITY_THRESHOLD, num_perm=NUM_PERM, bands=BANDS):
+    """Find clusters of near-duplicate functions across a combined project analysis.
+
+    Returns clusters sorted by duplicated lines, each with its estimated similarity and
+    the file, function name and line span of every member.
+    """
+    members = []
+    shingle_sets = []
+    for file_path, data in analysis.items():
+        for entry, shingles in zip(data.get('function_metrics', []), data.get('clone_shingles', [])):
+            if shingles.size:
+                members.append((file_path, data.get('language', ''), entry))
+                shingle_sets.append(shingles)
+    if len(members) < 2:
+        return []
+    signatures = minhash_signatures(shingle_sets, num_perm)
+    pairs = lsh_candidate_pairs(signatures, bands)
+    if pairs.size:
+        similarity = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+        pairs = pairs[similarity >= threshold]
+    clusters = []
+    for group in cluster_pairs(len(members), pairs):
+        group_sigs = signatures[group]
+        similarity = float((group_sigs == group_sigs[0]).mean())
+        cluster_members = []
+        for idx in group:
+            file_path, language, entry = members[idx]
+            cluster_members.append({
+                'file': os.path.relpath(file_path, project_path) if project_path else file_path,
+                'language': language,
+                'function': entry['name'],
+                'start_line': entry['line'],
+                'end_line': entry['line'] + entry['loc'] - 1,
+                'loc': entry['loc'],
+            })
+        clusters.append({
+            'similarity': similarity,
+            'duplicated_loc': sum(m['loc'] for m in cluster_members[1:]),
+            'members': cluster_members,
+        })
+    clusters.sort(key=lambda c: c['duplicated_loc'], reverse=True)
+    return clusters
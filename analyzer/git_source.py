@@ -0,0 +1,140 @@
+import os
+import pickle
+import subprocess
+import tempfile
+import threading
+from collections import OrderedDict
+
+# Bump when analyzer output changes so cached per-blob results are recomputed
+ANALYSIS_VERSION = 3
+DEFAULT_CACHE_DIR = os.environ.get(
+    "CODE_ANALYZER_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "code_analyzer", "blobs")
+)
+
+
+def run_git(repo_path, *args):
+    """Run a git plumbing command against a local repository and return its stdout bytes."""
+    result = subprocess.run(
+        ["git", "-C", repo_path, *args],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=True,
+    )
+    return result.stdout
+
+
+def resolve_commit(repo_path, revision="HEAD"):
+    """Resolve a branch, tag or abbreviated SHA to a full commit SHA."""
+    return run_git(repo_path, "rev-parse", "--verify", f"{revision}^{{commit}}").decode().strip()
+
+
+def list_tree_blobs(repo_path, commit):
+    """Return (path, blob_sha) for every regular file in a commit, read from the object store."""
+    output = run_git(repo_path, "ls-tree", "-r", "-z", "--full-tree", commit)
+    blobs = []
+    for record in output.split(b"\0"):
+        if not record:
+            continue
+        meta, path = record.split(b"\t", 1)
+        mode, object_type, sha = meta.split(b" ")
+        # Skip symlinks (120000) and submodules (type commit)
+        if object_type != b"blob" or mode == b"120000":
+            continue
+        blobs.append((path.decode("utf-8", errors="surrogateescape"), sha.decode()))
+    return blobs
+
+
+def read_blobs(repo_path, blob_shas):
+    """Yield (sha, content bytes) for each blob using a single `git cat-file --batch` process."""
+    if not blob_shas:
+        return
+    process = subprocess.Popen(
+        ["git", "-C", repo_path, "cat-file", "--batch"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+
+    def feed():
+        try:
+            for sha in blob_shas:
+                process.stdin.write(f"{sha}\n".encode())
+            process.stdin.close()
+        except OSError:
+            # The reader stopped early and git has gone away
+            pass
+
+    # Writing from a separate thread keeps both pipes flowing for large batches
+    writer = threading.Thread(target=feed, daemon=True)
+    writer.start()
+    try:
+        for _ in blob_shas:
+            header = process.stdout.readline().split()
+            if len(header) < 3 or header[1] == b"missing":
+                raise ValueError(f"Blob {header[0].decode() if header else '?'} is missing from {repo_path}")
+            size = int(header[2])
+            content = process.stdout.read(size)
+            process.stdout.read(1)  # Trailing newline after each object
+            yield header[0].decode(), content
+    finally:
+        process.stdout.close()
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+        writer.join()
+
+
+class BlobAnalysisCache:
+    """Per-file analysis results keyed by language and git blob SHA.
+
+    Results are kept in a bounded in-memory LRU and, when cache_dir is set, pickled to disk so
+    unchanged files are never re-parsed across commits, branches or restarts.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_memory_entries=100000):
+        self.cache_dir = cache_dir
+        self.max_memory_entries = max_memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, language, blob_sha):
+        return os.path.join(self.cache_dir, f"v{ANALYSIS_VERSION}", language, blob_sha[:2], f"{blob_sha}.pickle")
+
+    def _remember(self, key, result):
+        with self._lock:
+            self._memory[key] = result
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, language, blob_sha):
+        key = (language, blob_sha)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+        if self.cache_dir is None:
+            return None
+        try:
+            with open(self._path(language, blob_sha), "rb") as f:
+                result = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        self._remember(key, result)
+        return result
+
+    def put(self, language, blob_sha, result):
+        self._remember((language, blob_sha), result)
+        if self.cache_dir is None:
+            return
+        path = self._path(language, blob_sha)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so concurrent readers never see a partial pickle
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
@@ -1,76 +1,95 @@
 from tree_sitter_languages import get_language, get_parser
-import os
+from analyzer.metrics import count_lines, tree_sitter_function_metrics
+from analyzer.clones import tree_sitter_tokens, shingle_hashes
+from analyzer.summary import header_comment, record_doc
+from analyzer.limits import parse_source, check_depth, analyze_files
 
 # Initialize the Java language and parser
 JAVA_LANGUAGE = get_language('java')
 parser = get_parser('java')
 
-def analyze_java_project(project_path):
+def empty_java_analysis(loc=0):
+    """Return a Java file analysis with no elements; it also stands in for files that fail to analyze."""
+    return {
+        'classes': [],
+        'superclass': [],  # Store superclass for each class
+        'interfaces': [],  # Store interfaces implemented by each class
+        'methods': [],
+        'imports': [],
+        'function_metrics': [],
+        'clone_shingles': [],
+        'docs': [],
+        'loc': loc
+    }
+
+def analyze_java_file(code):
+    """Analyze the source of a single Java file and return a dictionary with classes, superclasses, interfaces, methods, and imports."""
+    tree = parse_source(parser, code)
+    file_analysis = empty_java_analysis(count_lines(code))
+    root_node = tree.root_node
+    header = header_comment(root_node, code)
+    if header:
+        file_analysis['docs'].append(header)
+    # Extract imports
+    for node in root_node.children:
+        if node.type == 'import_declaration':
+            import_text = code[node.start_byte:node.end_byte].strip()
+            package = import_text.replace('import ', '').replace(';', '').strip()
+            if package not in file_analysis['imports']:
+                file_analysis['imports'].append(package)
+    # Extract classes, superclasses, interfaces, and methods
+    def traverse(node, depth=0):
+        check_depth(depth)
+        if node.type == 'class_declaration':
+            class_name_node = node.child_by_field_name('name')
+            if class_name_node:
+                class_name = code[class_name_node.start_byte:class_name_node.end_byte]
+                file_analysis['classes'].append(class_name)
+                record_doc(file_analysis['docs'], node, code, class_name)
+                # Extract superclass (extends)
+                superclass_node = node.child_by_field_name('superclass')
+                if superclass_node:
+                    # The superclass node spans the `extends` keyword as well as the type
+                    superclass_name = code[superclass_node.start_byte:superclass_node.end_byte].replace('extends', '', 1).strip()
+                    file_analysis['superclass'].append(f"{class_name} extends {superclass_name}")
+                else:
+                    file_analysis['superclass'].append(f"{class_name} has no superclass")
+                # Extract interfaces (implements)
+                interfaces_node = node.child_by_field_name('interfaces')
+                interfaces = []
+                if interfaces_node:
+                    for child in interfaces_node.children:
+                        if child.type == 'type_identifier' or child.type == 'generic_type':
+                            interface_name = code[child.start_byte:child.end_byte]
+                            interfaces.append(interface_name)
+                    if interfaces:
+                        file_analysis['interfaces'].append(f"{class_name} implements {', '.join(interfaces)}")
+                    else:
+                        file_analysis['interfaces'].append(f"{class_name} implements no interfaces")
+                else:
+                    file_analysis['interfaces'].append(f"{class_name} implements no interfaces")
+        elif node.type == 'method_declaration':
+            method_name_node = node.child_by_field_name('name')
+            if method_name_node:
+                method_name = code[method_name_node.start_byte:method_name_node.end_byte]
+                file_analysis['methods'].append(method_name)
+                record_doc(file_analysis['docs'], node, code, method_name)
+                file_analysis['function_metrics'].append(tree_sitter_function_metrics(
+                    node, method_name, 'java', code, node.child_by_field_name('parameters')))
+                file_analysis['clone_shingles'].append(shingle_hashes(tree_sitter_tokens(node)))
+        for child in node.children:
+            traverse(child, depth + 1)
+    traverse(root_node)
+    return file_analysis
+
+def analyze_java_project(project_path, should_stop=None):
     """Analyze a Java project and return a dictionary with classes, superclasses, interfaces, methods, and imports."""
-    analysis = {}
-    for root, _, files in os.walk(project_path):
-        for file in files:
-            if file.endswith('.java'):
-                file_path = os.path.join(root, file)
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    code = f.read()
-                tree = parser.parse(bytes(code, 'utf-8'))
-                analysis[file_path] = {
-                    'classes': [],
-                    'superclass': [],  # Store superclass for each class
-                    'interfaces': [],  # Store interfaces implemented by each class
-                    'methods': [],
-                    'imports': []
-                }
-                root_node = tree.root_node
-                # Extract imports
-                for node in root_node.children:
-                    if node.type == 'import_declaration':
-                        import_text = code[node.start_byte:node.end_byte].strip()
-                        package = import_text.replace('import ', '').replace(';', '').strip()
-                        if package not in analysis[file_path]['imports']:
-                            analysis[file_path]['imports'].append(package)
-                # Extract classes, superclasses, interfaces, and methods
-                def traverse(node):
-                    if node.type == 'class_declaration':
-                        class_name_node = node.child_by_field_name('name')
-                        if class_name_node:
-                            class_name = code[class_name_node.start_byte:class_name_node.end_byte]
-                            analysis[file_path]['classes'].append(class_name)
-                            # Extract superclass (extends)
-                            superclass_node = node.child_by_field_name('superclass')
-                            if superclass_node:
-                                superclass_name = code[superclass_node.start_byte:superclass_node.end_byte]
-                                analysis[file_path]['superclass'].append(f"{class_name} extends {superclass_name}")
-                            else:
-                                analysis[file_path]['superclass'].append(f"{class_name} has no superclass")
-                            # Extract interfaces (implements)
-                            interfaces_node = node.child_by_field_name('interfaces')
-                            interfaces = []
-                            if interfaces_node:
-                                for child in interfaces_node.children:
-                                    if child.type == 'type_identifier' or child.type == 'generic_type':
-                                        interface_name = code[child.start_byte:child.end_byte]
-                                        interfaces.append(interface_name)
-                                if interfaces:
-                                    analysis[file_path]['interfaces'].append(f"{class_name} implements {', '.join(interfaces)}")
-                                else:
-                                    analysis[file_path]['interfaces'].append(f"{class_name} implements no interfaces")
-                            else:
-                                analysis[file_path]['interfaces'].append(f"{class_name} implements no interfaces")
-                    elif node.type == 'method_declaration':
-                        method_name_node = node.child_by_field_name('name')
-                        if method_name_node:
-                            method_name = code[method_name_node.start_byte:method_name_node.end_byte]
-                            analysis[file_path]['methods'].append(method_name)
-                    for child in node.children:
-                        traverse(child)
-                traverse(root_node)
-    return analysis
+    return analyze_files(project_path, ('.java',), analyze_java_file, empty_java_analysis, should_stop)
 
-def explain_java_code(project_path):
+def explain_java_code(project_path, analysis=None):
     """Generate a summary of the Java project structure based on the current analysis."""
-    analysis = analyze_java_project(project_path)
+    if analysis is None:
+        analysis = analyze_java_project(project_path)
     total_classes = sum(len(data['classes']) for data in analysis.values())
     total_methods = sum(len(data['methods']) for data in analysis.values())
     total_imports = set(pkg for data in analysis.values() for pkg in data['imports'])
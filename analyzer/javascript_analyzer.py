@@ -1,81 +1,104 @@
 from tree_sitter_languages import get_language, get_parser
-import os
+from analyzer.metrics import count_lines, tree_sitter_function_metrics
+from analyzer.clones import tree_sitter_tokens, shingle_hashes
+from analyzer.summary import header_comment, record_doc
+from analyzer.limits import parse_source, check_depth, analyze_files
 
 # Initialize the JavaScript language and parser
 JAVASCRIPT_LANGUAGE = get_language('javascript')
 parser = get_parser('javascript')
 
-def analyze_javascript_project(project_path):
+def empty_javascript_analysis(loc=0):
+    """Return a JavaScript file analysis with no elements; it also stands in for files that fail to analyze."""
+    return {
+        'classes': [],
+        'functions': [],
+        'methods': [],
+        'imports': [],
+        'global_vars': [],
+        'function_metrics': [],
+        'clone_shingles': [],
+        'docs': [],
+        'loc': loc
+    }
+
+def analyze_javascript_file(code):
+    """Analyze the source of a single JavaScript file and return a dictionary with classes, functions, methods, imports, and global variables."""
+    tree = parse_source(parser, code)
+    file_analysis = empty_javascript_analysis(count_lines(code))
+    root_node = tree.root_node
+    header = header_comment(root_node, code)
+    if header:
+        file_analysis['docs'].append(header)
+    # Extract imports (both ES6 import and CommonJS require)
+    for node in root_node.children:
+        if node.type == 'import_statement':
+            import_text = code[node.start_byte:node.end_byte].strip()
+            import_clause = node.child_by_field_name('source')
+            if import_clause:
+                module_name = code[import_clause.start_byte:import_clause.end_byte].strip("'\"")
+                file_analysis['imports'].append(module_name)
+        elif node.type == 'variable_declarator':
+            call_expression = node.child_by_field_name('value')
+            if call_expression and call_expression.type == 'call_expression':
+                callee = call_expression.child_by_field_name('function')
+                if callee and code[callee.start_byte:callee.end_byte] == 'require':
+                    args = call_expression.child_by_field_name('arguments')
+                    if args and args.child_count > 0:
+                        module_name = code[args.children[0].start_byte:args.children[0].end_byte].strip("'\"")
+                        file_analysis['imports'].append(module_name)
+        # Extract global variables
+        elif node.type == 'variable_declaration' and node.parent.type == 'program':
+            for declarator in node.children:
+                if declarator.type == 'variable_declarator':
+                    name_node = declarator.child_by_field_name('name')
+                    if name_node and name_node.type == 'identifier':
+                        var_name = code[name_node.start_byte:name_node.end_byte]
+                        file_analysis['global_vars'].append(var_name)
+    # Extract classes, functions, and methods
+    def traverse(node, depth=0):
+        check_depth(depth)
+        if node.type == 'class_declaration':
+            class_name_node = node.child_by_field_name('name')
+            if class_name_node:
+                class_name = code[class_name_node.start_byte:class_name_node.end_byte]
+                file_analysis['classes'].append(class_name)
+                record_doc(file_analysis['docs'], node, code, class_name)
+                body_node = node.child_by_field_name('body')
+                if body_node:
+                    for child in body_node.children:
+                        if child.type in ('method_definition', 'public_field_definition'):
+                            method_name_node = child.child_by_field_name('name')
+                            if method_name_node:
+                                method_name = code[method_name_node.start_byte:method_name_node.end_byte]
+                                file_analysis['methods'].append(method_name)
+                                record_doc(file_analysis['docs'], child, code, method_name)
+                                if child.type == 'method_definition':
+                                    file_analysis['function_metrics'].append(tree_sitter_function_metrics(
+                                        child, method_name, 'javascript', code, child.child_by_field_name('parameters')))
+                                    file_analysis['clone_shingles'].append(shingle_hashes(tree_sitter_tokens(child)))
+        elif node.type == 'function_declaration':
+            func_name_node = node.child_by_field_name('name')
+            if func_name_node:
+                func_name = code[func_name_node.start_byte:func_name_node.end_byte]
+                file_analysis['functions'].append(func_name)
+                record_doc(file_analysis['docs'], node, code, func_name)
+                file_analysis['function_metrics'].append(tree_sitter_function_metrics(
+                    node, func_name, 'javascript', code, node.child_by_field_name('parameters')))
+                file_analysis['clone_shingles'].append(shingle_hashes(tree_sitter_tokens(node)))
+        for child in node.children:
+            traverse(child, depth + 1)
+    traverse(root_node)
+    return file_analysis
+
+def analyze_javascript_project(project_path, should_stop=None):
     """Analyze a JavaScript project and return a dictionary with classes, functions, methods, imports, and global variables."""
-    analysis = {}
-    for root, _, files in os.walk(project_path):
-        for file in files:
-            if file.endswith('.js'):
-                file_path = os.path.join(root, file)
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    code = f.read()
-                tree = parser.parse(bytes(code, 'utf-8'))
-                analysis[file_path] = {
-                    'classes': [],
-                    'functions': [],
-                    'methods': [],
-                    'imports': [],
-                    'global_vars': []
-                }
-                root_node = tree.root_node
-                # Extract imports (both ES6 import and CommonJS require)
-                for node in root_node.children:
-                    if node.type == 'import_statement':
-                        import_text = code[node.start_byte:node.end_byte].strip()
-                        import_clause = node.child_by_field_name('source')
-                        if import_clause:
-                            module_name = code[import_clause.start_byte:import_clause.end_byte].strip("'\"")
-                            analysis[file_path]['imports'].append(module_name)
-                    elif node.type == 'variable_declarator':
-                        call_expression = node.child_by_field_name('value')
-                        if call_expression and call_expression.type == 'call_expression':
-                            callee = call_expression.child_by_field_name('function')
-                            if callee and code[callee.start_byte:callee.end_byte] == 'require':
-                                args = call_expression.child_by_field_name('arguments')
-                                if args and args.child_count > 0:
-                                    module_name = code[args.children[0].start_byte:args.children[0].end_byte].strip("'\"")
-                                    analysis[file_path]['imports'].append(module_name)
-                    # Extract global variables
-                    elif node.type == 'variable_declaration' and node.parent.type == 'program':
-                        for declarator in node.children:
-                            if declarator.type == 'variable_declarator':
-                                name_node = declarator.child_by_field_name('name')
-                                if name_node and name_node.type == 'identifier':
-                                    var_name = code[name_node.start_byte:name_node.end_byte]
-                                    analysis[file_path]['global_vars'].append(var_name)
-                # Extract classes, functions, and methods
-                def traverse(node):
-                    if node.type == 'class_declaration':
-                        class_name_node = node.child_by_field_name('name')
-                        if class_name_node:
-                            class_name = code[class_name_node.start_byte:class_name_node.end_byte]
-                            analysis[file_path]['classes'].append(class_name)
-                            body_node = node.child_by_field_name('body')
-                            if body_node:
-                                for child in body_node.children:
-                                    if child.type in ('method_definition', 'public_field_definition'):
-                                        method_name_node = child.child_by_field_name('name')
-                                        if method_name_node:
-                                            method_name = code[method_name_node.start_byte:method_name_node.end_byte]
-                                            analysis[file_path]['methods'].append(method_name)
-                    elif node.type == 'function_declaration':
-                        func_name_node = node.child_by_field_name('name')
-                        if func_name_node:
-                            func_name = code[func_name_node.start_byte:func_name_node.end_byte]
-                            analysis[file_path]['functions'].append(func_name)
-                    for child in node.children:
-                        traverse(child)
-                traverse(root_node)
-    return analysis
+    return analyze_files(project_path, ('.js',), analyze_javascript_file, empty_javascript_analysis, should_stop)
 
-def explain_javascript_code(project_path):
+def explain_javascript_code(project_path, analysis=None):
     """Generate a summary of the JavaScript project structure based on the current analysis."""
-    analysis = analyze_javascript_project(project_path)
+    if analysis is None:
+        analysis = analyze_javascript_project(project_path)
     total_classes = sum(len(data['classes']) for data in analysis.values())
     total_functions = sum(len(data['functions']) for data in analysis.values())
     total_methods = sum(len(data['methods']) for data in analysis.values())
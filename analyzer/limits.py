@@ -0,0 +1,112 @@
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Per-file resource limits; override through the environment for unusual projects
+MAX_FILE_BYTES = int(os.environ.get("CODE_ANALYZER_MAX_FILE_BYTES", 2 * 1024 * 1024))
+PARSE_TIMEOUT = float(os.environ.get("CODE_ANALYZER_PARSE_TIMEOUT", 10.0))  # Seconds per tree-sitter parse
+SLOW_FILE_SECONDS = float(os.environ.get("CODE_ANALYZER_SLOW_FILE_SECONDS", 2.0))  # Files slower than this are logged
+MAX_TREE_DEPTH = 400  # Syntax tree levels walked during extraction, well inside Python's recursion limit
+# Failures that depend on machine load or the limits above rather than on file content
+UNCACHEABLE_ERRORS = ('timeout', 'too_large')
+
+
+class FileAnalysisError(Exception):
+    """A single file could not be analyzed; `kind` is a short machine-readable category."""
+
+    def __init__(self, kind, message):
+        super().__init__(message)
+        self.kind = kind
+        self.message = message
+
+
+def parse_source(parser, code):
+    """Parse code with a tree-sitter parser, giving up after PARSE_TIMEOUT seconds."""
+    parser.set_timeout_micros(int(PARSE_TIMEOUT * 1_000_000))
+    try:
+        return parser.parse(bytes(code, 'utf-8'))
+    except ValueError:
+        # A timed-out parser resumes the old parse on the next call unless it is reset
+        parser.reset()
+        raise FileAnalysisError('timeout', f"tree-sitter parse exceeded {PARSE_TIMEOUT:g}s")
+
+
+def check_depth(depth):
+    """Stop extraction of syntax trees nested deeper than MAX_TREE_DEPTH."""
+    if depth > MAX_TREE_DEPTH:
+        raise FileAnalysisError('depth', f"syntax tree is nested deeper than {MAX_TREE_DEPTH} levels")
+
+
+def analyze_guarded(file_path, size, read_code, analyze_file, empty_analysis):
+    """Analyze one file within the size cap, isolating any failure to that file.
+
+    read_code() returns the decoded source and is skipped for files over MAX_FILE_BYTES. A file
+    that fails gets empty_analysis() with an 'analysis_error' entry ({'kind', 'message'}) instead
+    of raising. Every result records its 'seconds'; files slower than SLOW_FILE_SECONDS are logged.
+    """
+    started = time.monotonic()
+    error = None
+    try:
+        if size > MAX_FILE_BYTES:
+            raise FileAnalysisError('too_large', f"{size} bytes exceeds the {MAX_FILE_BYTES} byte limit")
+        file_analysis = analyze_file(read_code())
+    except FileAnalysisError as e:
+        error = e
+    except UnicodeDecodeError as e:
+        error = FileAnalysisError('encoding', f"not valid UTF-8 (invalid byte at offset {e.start})")
+    except SyntaxError as e:
+        error = FileAnalysisError('syntax', f"line {e.lineno}: {e.msg}")
+    except RecursionError:
+        error = FileAnalysisError('depth', "syntax tree is nested too deeply to analyze")
+    except Exception as e:
+        error = FileAnalysisError('error', f"{type(e).__name__}: {e}")
+    seconds = time.monotonic() - started
+    if error is not None:
+        logger.warning("Skipped %s (%s): %s", file_path, error.kind, error.message)
+        file_analysis = empty_analysis()
+        file_analysis['analysis_error'] = {'kind': error.kind, 'message': error.message}
+    if seconds > SLOW_FILE_SECONDS:
+        logger.warning("Slow file %s took %.2fs", file_path, seconds)
+    file_analysis['seconds'] = round(seconds, 3)
+    return file_analysis
+
+
+def analyze_files(project_path, extensions, analyze_file, empty_analysis, should_stop=None):
+    """Walk project_path and analyze every file with one of the extensions, one file at a time.
+
+    Returns None if should_stop() becomes true before a file.
+    """
+    analysis = {}
+    for root, _, files in os.walk(project_path):
+        for file in files:
+            if file.endswith(extensions):
+                if should_stop is not None and should_stop():
+                    return None
+                file_path = os.path.join(root, file)
+
+                def read_code(file_path=file_path):
+                    with open(file_path, 'r', encoding='utf-8') as f:
+                        return f.read()
+
+                analysis[file_path] = analyze_guarded(file_path, os.path.getsize(file_path), read_code,
+                                                      analyze_file, empty_analysis)
+    return analysis
+
+
+def file_errors(analysis):
+    """Structured list of the files that could not be analyzed: file, language, kind and message."""
+    return [
+        {'file': file_path, 'language': data.get('language', ''), **data['analysis_error']}
+        for file_path, data in analysis.items() if 'analysis_error' in data
+    ]
+
+
+def slow_files(analysis, threshold=SLOW_FILE_SECONDS):
+    """Files whose analysis took longer than threshold seconds, slowest first."""
+    slow = [
+        {'file': file_path, 'language': data.get('language', ''), 'seconds': data['seconds']}
+        for file_path, data in analysis.items() if data.get('seconds', 0) > threshold
+    ]
+    return sorted(slow, key=lambda row: -row['seconds'])
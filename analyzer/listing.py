@@ -0,0 +1,158 @@
+import csv
+import heapq
+import io
+import os
+from collections import Counter
+from itertools import islice
+
+ELEMENT_COLUMNS = ('language', 'file', 'kind', 'name')
+FILE_COLUMNS = ('language', 'file', 'loc', 'classes', 'functions', 'methods', 'imports')
+
+
+class ResultSet:
+    """Lazily evaluated listing rows with server-side filtering, sorting, grouping and paging.
+
+    Rows come from `source`, a zero-argument callable returning a fresh iterator of tuples, and
+    are never held as a whole: counts and groups stream through them, an unsorted page is an
+    islice, and a sorted page only keeps the rows up to the end of that page in a heap. Every
+    refinement returns a new ResultSet, so the same base set can back several widgets.
+    """
+
+    def __init__(self, columns, source, predicates=(), sort_columns=(), descending=False, distinct=False):
+        self.columns = tuple(columns)
+        self._source = source
+        self._predicates = tuple(predicates)
+        self._sort_columns = tuple(sort_columns)
+        self._descending = descending
+        self._distinct = distinct
+
+    def _derive(self, **changes):
+        options = {
+            'predicates': self._predicates,
+            'sort_columns': self._sort_columns,
+            'descending': self._descending,
+            'distinct': self._distinct,
+        }
+        options.update(changes)
+        return ResultSet(self.columns, self._source, **options)
+
+    def _index(self, column):
+        return self.columns.index(column)
+
+    def __iter__(self):
+        """Iterate over matching rows in source order."""
+        rows = self._source()
+        for predicate in self._predicates:
+            rows = filter(predicate, rows)
+        if self._distinct:
+            rows = _unique(rows)
+        return rows
+
+    def where_in(self, column, values):
+        """Keep rows whose column value is one of values; an empty selection keeps everything."""
+        if not values:
+            return self
+        index, allowed = self._index(column), set(values)
+        return self._derive(predicates=self._predicates + (lambda row: row[index] in allowed,))
+
+    def search(self, text):
+        """Keep rows where any column contains text, ignoring case."""
+        text = (text or '').strip().lower()
+        if not text:
+            return self
+        return self._derive(predicates=self._predicates + (
+            lambda row: any(text in str(value).lower() for value in row),))
+
+    def select(self, *columns):
+        """Keep only the given columns, in that order; refinements so far apply before the projection."""
+        indexes = [self._index(column) for column in columns]
+        return ResultSet(columns, lambda: (tuple(row[i] for i in indexes) for row in self))
+
+    def unique(self):
+        """Drop repeated rows, keeping the first occurrence."""
+        return self._derive(distinct=True)
+
+    def sort_by(self, *columns, descending=False):
+        """Order rows by the given columns; no columns keeps source order."""
+        for column in columns:
+            self._index(column)
+        return self._derive(sort_columns=tuple(columns), descending=descending)
+
+    def _sort_key(self):
+        indexes = [self._index(column) for column in self._sort_columns]
+        return lambda row: tuple(row[i] for i in indexes)
+
+    def count(self):
+        return sum(1 for _ in self)
+
+    def group_counts(self, column):
+        """Return (value, row count) pairs for a column, largest groups first."""
+        index = self._index(column)
+        return Counter(row[index] for row in self).most_common()
+
+    def page(self, number, size):
+        """Return page `number` (0-based) as a list of dicts; only these rows are materialized."""
+        start, end = number * size, (number + 1) * size
+        if not self._sort_columns:
+            rows = list(islice(iter(self), start, end))
+        else:
+            select = heapq.nlargest if self._descending else heapq.nsmallest
+            rows = select(end, self, key=self._sort_key())[start:end]
+        return [dict(zip(self.columns, row)) for row in rows]
+
+    def csv_export(self):
+        """Return every matching row as UTF-8 CSV bytes, in the set's sort order."""
+        text = io.StringIO(newline='')
+        writer = csv.writer(text)
+        writer.writerow(self.columns)
+        rows = iter(self)
+        if self._sort_columns:
+            rows = sorted(rows, key=self._sort_key(), reverse=self._descending)
+        writer.writerows(rows)
+        return text.getvalue().encode('utf-8')
+
+
+def _unique(rows):
+    seen = set()
+    for row in rows:
+        if row not in seen:
+            seen.add(row)
+            yield row
+
+
+def element_listing(analysis, keys, project_path, skip=None):
+    """ResultSet of (language, file, kind, name) rows for the given analysis keys.
+
+    `skip` drops placeholder entries such as "X has no superclass".
+    """
+    def rows():
+        for file_path, data in analysis.items():
+            relative = os.path.relpath(file_path, project_path)
+            language = data.get('language', '')
+            for key in keys:
+                for name in data.get(key, []):
+                    if skip is None or not skip(name):
+                        yield (language, relative, key, name)
+    return ResultSet(ELEMENT_COLUMNS, rows)
+
+
+def module_listing(analysis, project_path):
+    """ResultSet of the project's imports, includes and uses, one row per (language, kind, name)."""
+    imports = element_listing(analysis, ('imports', 'includes', 'uses'), project_path)
+    return imports.select('language', 'kind', 'name').unique()
+
+
+def file_listing(analysis, project_path):
+    """ResultSet with one row per analyzed file and its element counts."""
+    def rows():
+        for file_path, data in analysis.items():
+            yield (
+                data.get('language', ''),
+                os.path.relpath(file_path, project_path),
+                data.get('loc', 0),
+                len(data.get('classes', [])) + len(data.get('structs', [])),
+                len(data.get('functions', [])),
+                len(data.get('methods', [])),
+                len(data.get('imports', [])) + len(data.get('includes', [])) + len(data.get('uses', [])),
+            )
+    return ResultSet(FILE_COLUMNS, rows)
@@ -0,0 +1,173 @@
+import os
+import numpy as np
+
+# Node types that add a decision point (cyclomatic complexity) per tree-sitter grammar
+DECISION_NODES = {
+    'java': {'if_statement', 'for_statement', 'enhanced_for_statement', 'while_statement', 'do_statement',
+             'catch_clause', 'ternary_expression', 'switch_label'},
+    'javascript': {'if_statement', 'for_statement', 'for_in_statement', 'while_statement', 'do_statement',
+                   'catch_clause', 'ternary_expression', 'switch_case'},
+    'c': {'if_statement', 'for_statement', 'while_statement', 'do_statement', 'conditional_expression',
+          'case_statement'},
+    'php': {'if_statement', 'else_if_clause', 'for_statement', 'foreach_statement', 'while_statement',
+            'do_statement', 'catch_clause', 'conditional_expression', 'case_statement'},
+}
+
+# Node types that open a new nesting level
+NESTING_NODES = {
+    'java': {'if_statement', 'for_statement', 'enhanced_for_statement', 'while_statement', 'do_statement',
+             'switch_expression', 'switch_statement', 'try_statement', 'catch_clause'},
+    'javascript': {'if_statement', 'for_statement', 'for_in_statement', 'while_statement', 'do_statement',
+                   'switch_statement', 'try_statement', 'catch_clause'},
+    'c': {'if_statement', 'for_statement', 'while_statement', 'do_statement', 'switch_statement'},
+    'php': {'if_statement', 'for_statement', 'foreach_statement', 'while_statement', 'do_statement',
+            'switch_statement', 'try_statement', 'catch_clause'},
+}
+
+# Nested function nodes get their own metrics entry, so they are not counted in the enclosing one
+FUNCTION_NODES = {
+    'java': {'method_declaration', 'constructor_declaration', 'lambda_expression'},
+    'javascript': {'function_declaration', 'function', 'function_expression', 'arrow_function',
+                   'method_definition', 'generator_function_declaration'},
+    'c': {'function_definition'},
+    'php': {'function_definition', 'method_declaration', 'anonymous_function_creation_expression',
+            'arrow_function'},
+}
+
+BOOLEAN_OPERATORS = {'&&', '||', 'and', 'or', '??'}
+
+METRIC_FIELDS = ('complexity', 'nesting', 'loc', 'params')
+
+
+def count_parameters(params_node, code):
+    """Count the declared parameters of a tree-sitter parameter list node."""
+    if params_node is None:
+        return 0
+    params = [child for child in params_node.named_children if child.type != 'comment']
+    # C uses `f(void)` to declare an empty parameter list
+    if len(params) == 1 and code[params[0].start_byte:params[0].end_byte].strip() == 'void':
+        return 0
+    return len(params)
+
+
+def tree_sitter_function_metrics(node, name, language, code, params_node=None):
+    """Compute cyclomatic complexity, nesting depth, LOC and parameter count for a tree-sitter function node."""
+    decisions = DECISION_NODES[language]
+    nesting_types = NESTING_NODES[language]
+    function_types = FUNCTION_NODES[language]
+    complexity = 1
+    max_depth = 0
+    # Iterative walk so deeply nested bodies cannot exhaust the Python stack
+    stack = [(child, 0) for child in node.children]
+    while stack:
+        current, depth = stack.pop()
+        if current.type in function_types:
+            continue
+        if current.type in decisions:
+            # `default:` labels share the case node type but add no branch
+            if not (current.children and current.children[0].type == 'default'):
+                complexity += 1
+        elif current.type == 'binary_expression':
+            operator = current.child_by_field_name('operator')
+            if operator is not None and operator.type in BOOLEAN_OPERATORS:
+                complexity += 1
+        if current.type in nesting_types:
+            depth += 1
+            max_depth = max(max_depth, depth)
+        for child in current.children:
+            stack.append((child, depth))
+    return {
+        'name': name,
+        'line': node.start_point[0] + 1,
+        'loc': node.end_point[0] - node.start_point[0] + 1,
+        'complexity': complexity,
+        'nesting': max_depth,
+        'params': count_parameters(params_node, code),
+    }
+
+
+def count_lines(code):
+    """Return the number of lines in a source string."""
+    if not code:
+        return 0
+    return code.count('\n') + (0 if code.endswith('\n') else 1)
+
+
+def build_project_metrics(analysis):
+    """Flatten per-file function metrics from a combined analysis into NumPy arrays."""
+    files = list(analysis.keys())
+    names = []
+    file_index = []
+    columns = {field: [] for field in ('line',) + METRIC_FIELDS}
+    for idx, file_path in enumerate(files):
+        for entry in analysis[file_path].get('function_metrics', []):
+            names.append(entry['name'])
+            file_index.append(idx)
+            for field in columns:
+                columns[field].append(entry[field])
+    metrics = {
+        'files': np.array(files, dtype=object),
+        'file_language': np.array([analysis[f].get('language', '') for f in files], dtype=object),
+        'file_loc': np.array([analysis[f].get('loc', 0) for f in files], dtype=np.int64),
+        'names': np.array(names, dtype=object),
+        'file_index': np.array(file_index, dtype=np.int64),
+    }
+    for field, values in columns.items():
+        metrics[field] = np.array(values, dtype=np.int64)
+    return metrics
+
+
+def top_functions(metrics, field='complexity', n=10):
+    """Return indices of the n functions with the highest value of the given metric."""
+    values = metrics[field]
+    if values.size == 0:
+        return np.array([], dtype=np.int64)
+    n = min(n, values.size)
+    # argpartition keeps this O(N) before sorting just the top slice
+    top = np.argpartition(-values, n - 1)[:n]
+    return top[np.argsort(-values[top], kind='stable')]
+
+
+def largest_files(metrics, n=10):
+    """Return indices of the n files with the most lines of code."""
+    file_loc = metrics['file_loc']
+    if file_loc.size == 0:
+        return np.array([], dtype=np.int64)
+    n = min(n, file_loc.size)
+    top = np.argpartition(-file_loc, n - 1)[:n]
+    return top[np.argsort(-file_loc[top], kind='stable')]
+
+
+def metric_percentiles(metrics, field='complexity', percentiles=(50, 90, 99)):
+    """Return a dict mapping each percentile to the value of the given metric."""
+    values = metrics[field]
+    if values.size == 0:
+        return {p: 0.0 for p in percentiles}
+    return dict(zip(percentiles, np.percentile(values, percentiles).tolist()))
+
+
+def directory_aggregates(metrics, project_path, field='complexity'):
+    """Sum and max of a metric per directory, plus function count and LOC, sorted by total."""
+    files = metrics['files']
+    if files.size == 0:
+        return []
+    file_dirs = np.array([os.path.dirname(os.path.relpath(f, project_path)) or '.' for f in files], dtype=object)
+    directories, file_dir_index = np.unique(file_dirs, return_inverse=True)
+    func_dir_index = file_dir_index[metrics['file_index']]
+    totals = np.bincount(func_dir_index, weights=metrics[field], minlength=directories.size)
+    counts = np.bincount(func_dir_index, minlength=directories.size)
+    loc = np.bincount(file_dir_index, weights=metrics['file_loc'], minlength=directories.size)
+    maxima = np.zeros(directories.size, dtype=np.int64)
+    np.maximum.at(maxima, func_dir_index, metrics[field])
+    order = np.argsort(-totals, kind='stable')
+    return [
+        {
+            'directory': directories[i],
+            'functions': int(counts[i]),
+            'loc': int(loc[i]),
+            f'total_{field}': int(totals[i]),
+            f'max_{field}': int(maxima[i]),
+            f'mean_{field}': float(totals[i] / counts[i]) if counts[i] else 0.0,
+        }
+        for i in order
+    ]
@@ -1,103 +1,125 @@
 from tree_sitter_languages import get_language, get_parser
-import os
+from analyzer.metrics import count_lines, tree_sitter_function_metrics
+from analyzer.clones import tree_sitter_tokens, shingle_hashes
+from analyzer.summary import header_comment, record_doc
+from analyzer.limits import parse_source, check_depth, analyze_files
 
 # Initialize the PHP language and parser
 PHP_LANGUAGE = get_language('php')
 parser = get_parser('php')
 
-def analyze_php_project(project_path):
+def empty_php_analysis(loc=0):
+    """Return a PHP file analysis with no elements; it also stands in for files that fail to analyze."""
+    return {
+        'classes': [],
+        'parent_classes': [],  # Store parent class for each class (extends)
+        'interfaces': [],      # Store interfaces implemented by each class
+        'traits': [],          # Store traits used by each class
+        'methods': [],
+        'functions': [],
+        'uses': [],            # Store use statements (imports)
+        'function_metrics': [],
+        'clone_shingles': [],
+        'docs': [],
+        'loc': loc
+    }
+
+def analyze_php_file(code):
+    """Analyze the source of a single PHP file and return a dictionary with classes, parent classes, interfaces, traits, methods, functions, and use statements."""
+    tree = parse_source(parser, code)
+    file_analysis = empty_php_analysis(count_lines(code))
+    root_node = tree.root_node
+    header = header_comment(root_node, code)
+    if header:
+        file_analysis['docs'].append(header)
+    # Extract use statements
+    for node in root_node.children:
+        if node.type == 'use_declaration':
+            for child in node.children:
+                if child.type == 'name':
+                    use_name = code[child.start_byte:child.end_byte].strip()
+                    if use_name not in file_analysis['uses']:
+                        file_analysis['uses'].append(use_name)
+    # Extract classes, parent classes, interfaces, traits, methods, and functions
+    def traverse(node, depth=0):
+        check_depth(depth)
+        if node.type == 'class_declaration':
+            class_name_node = node.child_by_field_name('name')
+            if class_name_node:
+                class_name = code[class_name_node.start_byte:class_name_node.end_byte]
+                file_analysis['classes'].append(class_name)
+                record_doc(file_analysis['docs'], node, code, class_name)
+                # Extract parent class (extends)
+                parent_class_node = node.child_by_field_name('base_clause')
+                if parent_class_node:
+                    for child in parent_class_node.children:
+                        if child.type == 'name':
+                            parent_name = code[child.start_byte:child.end_byte]
+                            file_analysis['parent_classes'].append(f"{class_name} extends {parent_name}")
+                            break
+                else:
+                    file_analysis['parent_classes'].append(f"{class_name} has no parent class")
+                # Extract interfaces (implements)
+                interfaces_node = node.child_by_field_name('class_interface_clause')
+                interfaces = []
+                if interfaces_node:
+                    for child in interfaces_node.children:
+                        if child.type == 'name':
+                            interface_name = code[child.start_byte:child.end_byte]
+                            interfaces.append(interface_name)
+                    if interfaces:
+                        file_analysis['interfaces'].append(f"{class_name} implements {', '.join(interfaces)}")
+                    else:
+                        file_analysis['interfaces'].append(f"{class_name} implements no interfaces")
+                else:
+                    file_analysis['interfaces'].append(f"{class_name} implements no interfaces")
+                # Extract traits (use statements within class body)
+                body_node = node.child_by_field_name('body')
+                traits = []
+                if body_node:
+                    for child in body_node.children:
+                        if child.type == 'trait_use_clause':
+                            for grand_child in child.children:
+                                if grand_child.type == 'name':
+                                    trait_name = code[grand_child.start_byte:grand_child.end_byte]
+                                    traits.append(trait_name)
+                            if traits:
+                                file_analysis['traits'].append(f"{class_name} uses {', '.join(traits)}")
+                    if not traits:
+                        file_analysis['traits'].append(f"{class_name} uses no traits")
+                else:
+                    file_analysis['traits'].append(f"{class_name} uses no traits")
+        elif node.type == 'method_declaration':
+            method_name_node = node.child_by_field_name('name')
+            if method_name_node:
+                method_name = code[method_name_node.start_byte:method_name_node.end_byte]
+                file_analysis['methods'].append(method_name)
+                record_doc(file_analysis['docs'], node, code, method_name)
+                file_analysis['function_metrics'].append(tree_sitter_function_metrics(
+                    node, method_name, 'php', code, node.child_by_field_name('parameters')))
+                file_analysis['clone_shingles'].append(shingle_hashes(tree_sitter_tokens(node)))
+        elif node.type in ('function_definition', 'function_declaration'):
+            func_name_node = node.child_by_field_name('name')
+            if func_name_node:
+                func_name = code[func_name_node.start_byte:func_name_node.end_byte]
+                file_analysis['functions'].append(func_name)
+                record_doc(file_analysis['docs'], node, code, func_name)
+                file_analysis['function_metrics'].append(tree_sitter_function_metrics(
+                    node, func_name, 'php', code, node.child_by_field_name('parameters')))
+                file_analysis['clone_shingles'].append(shingle_hashes(tree_sitter_tokens(node)))
+        for child in node.children:
+            traverse(child, depth + 1)
+    traverse(root_node)
+    return file_analysis
+
+def analyze_php_project(project_path, should_stop=None):
     """Analyze a PHP project and return a dictionary with classes, parent classes, interfaces, traits, methods, functions, and use statements."""
-    analysis = {}
-    for root, _, files in os.walk(project_path):
-        for file in files:
-            if file.endswith('.php'):
-                file_path = os.path.join(root, file)
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    code = f.read()
-                tree = parser.parse(bytes(code, 'utf-8'))
-                analysis[file_path] = {
-                    'classes': [],
-                    'parent_classes': [],  # Store parent class for each class (extends)
-                    'interfaces': [],      # Store interfaces implemented by each class
-                    'traits': [],          # Store traits used by each class
-                    'methods': [],
-                    'functions': [],
-                    'uses': []             # Store use statements (imports)
-                }
-                root_node = tree.root_node
-                # Extract use statements
-                for node in root_node.children:
-                    if node.type == 'use_declaration':
-                        for child in node.children:
-                            if child.type == 'name':
-                                use_name = code[child.start_byte:child.end_byte].strip()
-                                if use_name not in analysis[file_path]['uses']:
-                                    analysis[file_path]['uses'].append(use_name)
-                # Extract classes, parent classes, interfaces, traits, methods, and functions
-                def traverse(node):
-                    if node.type == 'class_declaration':
-                        class_name_node = node.child_by_field_name('name')
-                        if class_name_node:
-                            class_name = code[class_name_node.start_byte:class_name_node.end_byte]
-                            analysis[file_path]['classes'].append(class_name)
-                            # Extract parent class (extends)
-                            parent_class_node = node.child_by_field_name('base_clause')
-                            if parent_class_node:
-                                for child in parent_class_node.children:
-                                    if child.type == 'name':
-                                        parent_name = code[child.start_byte:child.end_byte]
-                                        analysis[file_path]['parent_classes'].append(f"{class_name} extends {parent_name}")
-                                        break
-                            else:
-                                analysis[file_path]['parent_classes'].append(f"{class_name} has no parent class")
-                            # Extract interfaces (implements)
-                            interfaces_node = node.child_by_field_name('class_interface_clause')
-                            interfaces = []
-                            if interfaces_node:
-                                for child in interfaces_node.children:
-                                    if child.type == 'name':
-                                        interface_name = code[child.start_byte:child.end_byte]
-                                        interfaces.append(interface_name)
-                                if interfaces:
-                                    analysis[file_path]['interfaces'].append(f"{class_name} implements {', '.join(interfaces)}")
-                                else:
-                                    analysis[file_path]['interfaces'].append(f"{class_name} implements no interfaces")
-                            else:
-                                analysis[file_path]['interfaces'].append(f"{class_name} implements no interfaces")
-                            # Extract traits (use statements within class body)
-                            body_node = node.child_by_field_name('body')
-                            traits = []
-                            if body_node:
-                                for child in body_node.children:
-                                    if child.type == 'trait_use_clause':
-                                        for grand_child in child.children:
-                                            if grand_child.type == 'name':
-                                                trait_name = code[grand_child.start_byte:grand_child.end_byte]
-                                                traits.append(trait_name)
-                                        if traits:
-                                            analysis[file_path]['traits'].append(f"{class_name} uses {', '.join(traits)}")
-                                if not traits:
-                                    analysis[file_path]['traits'].append(f"{class_name} uses no traits")
-                            else:
-                                analysis[file_path]['traits'].append(f"{class_name} uses no traits")
-                    elif node.type == 'method_declaration':
-                        method_name_node = node.child_by_field_name('name')
-                        if method_name_node:
-                            method_name = code[method_name_node.start_byte:method_name_node.end_byte]
-                            analysis[file_path]['methods'].append(method_name)
-                    elif node.type == 'function_declaration':
-                        func_name_node = node.child_by_field_name('name')
-                        if func_name_node:
-                            func_name = code[func_name_node.start_byte:func_name_node.end_byte]
-                            analysis[file_path]['functions'].append(func_name)
-                    for child in node.children:
-                        traverse(child)
-                traverse(root_node)
-    return analysis
+    return analyze_files(project_path, ('.php',), analyze_php_file, empty_php_analysis, should_stop)
 
-def explain_php_code(project_path):
+def explain_php_code(project_path, analysis=None):
     """Generate a summary of the PHP project structure based on the current analysis."""
-    analysis = analyze_php_project(project_path)
+    if analysis is None:
+        analysis = analyze_php_project(project_path)
     total_classes = sum(len(data['classes']) for data in analysis.values())
     total_methods = sum(len(data['methods']) for data in analysis.values())
     total_functions = sum(len(data['functions']) for data in analysis.values())
@@ -0,0 +1,279 @@
+import os
+from analyzer.python_analyzer import (analyze_python_project, analyze_python_file, empty_python_analysis,
+                                     explain_python_code)
+from analyzer.java_analyzer import analyze_java_project, analyze_java_file, empty_java_analysis, explain_java_code
+from analyzer.javascript_analyzer import (analyze_javascript_project, analyze_javascript_file,
+                                         empty_javascript_analysis, explain_javascript_code)
+from analyzer.c_analyzer import analyze_c_project, analyze_c_file, empty_c_analysis, explain_c_code
+from analyzer.php_analyzer import analyze_php_project, analyze_php_file, empty_php_analysis, explain_php_code
+from analyzer.git_source import resolve_commit, list_tree_blobs, read_blobs
+from analyzer.limits import analyze_guarded, file_errors, slow_files, UNCACHEABLE_ERRORS
+from analyzer.metrics import build_project_metrics
+from analyzer.clones import find_clone_clusters
+
+# Supported languages in detection order, with their file extensions
+LANGUAGE_EXTENSIONS = {
+    'Python': ('.py',),
+    'Java': ('.java',),
+    'JavaScript': ('.js',),
+    'C': ('.c', '.h'),
+    'PHP': ('.php',),
+}
+
+ANALYZERS = {
+    'Python': analyze_python_project,
+    'Java': analyze_java_project,
+    'JavaScript': analyze_javascript_project,
+    'C': analyze_c_project,
+    'PHP': analyze_php_project,
+}
+
+FILE_ANALYZERS = {
+    'Python': analyze_python_file,
+    'Java': analyze_java_file,
+    'JavaScript': analyze_javascript_file,
+    'C': analyze_c_file,
+    'PHP': analyze_php_file,
+}
+
+EMPTY_ANALYSES = {
+    'Python': empty_python_analysis,
+    'Java': empty_java_analysis,
+    'JavaScript': empty_javascript_analysis,
+    'C': empty_c_analysis,
+    'PHP': empty_php_analysis,
+}
+
+EXPLAINERS = {
+    'Python': explain_python_code,
+    'Java': explain_java_code,
+    'JavaScript': explain_javascript_code,
+    'C': explain_c_code,
+    'PHP': explain_php_code,
+}
+
+PURPOSES = {
+    'Python': "The Python portion is a code analysis tool that parses Python source files to extract structural elements like classes, functions, methods, and global variables using the `ast` module.",
+    'Java': "The Java portion is designed to manage its specific functionality based on the uploaded code.",
+    'JavaScript': "The JavaScript portion is designed to manage its specific functionality based on the uploaded code.",
+    'C': "The C portion is designed to manage its specific functionality based on the uploaded code.",
+    'PHP': "The PHP portion is designed to manage its specific functionality based on the uploaded code.",
+}
+
+
+def language_for_file(file_name):
+    """Return the supported language of a file name, or None."""
+    for language, extensions in LANGUAGE_EXTENSIONS.items():
+        if file_name.endswith(extensions):
+            return language
+    return None
+
+
+def detect_languages(project_path):
+    """Return the supported languages present in a project, in the order they are first seen."""
+    languages_detected = []
+    for root, _, files in os.walk(project_path):
+        for file in files:
+            language = language_for_file(file)
+            if language is not None and language not in languages_detected:
+                languages_detected.append(language)
+    return languages_detected
+
+
+def build_context(per_language):
+    """Build the LLM context string describing the analyzed project."""
+    context_parts = []
+
+    def names(analysis, key):
+        return [item for data in analysis.values() for item in data.get(key, [])]
+
+    def listing(items):
+        return ', '.join(items) if items else 'none'
+
+    if 'Python' in per_language:
+        python_analysis = per_language['Python']
+        classes = names(python_analysis, "classes")
+        functions = names(python_analysis, "functions")
+        methods = names(python_analysis, "methods")
+        imports = names(python_analysis, "imports")
+        global_vars = names(python_analysis, "global_vars")
+        context_parts.append(
+            f"Python code with {len(classes)} classes ({listing(classes)}), "
+            f"{len(functions)} functions ({listing(functions)}), "
+            f"{len(methods)} methods ({listing(methods)}), "
+            f"{len(global_vars)} global variables ({listing(global_vars)}), "
+            f"and {len(imports)} imported modules ({listing(imports)})."
+        )
+
+    if 'Java' in per_language:
+        java_analysis = per_language['Java']
+        classes = names(java_analysis, "classes")
+        methods = names(java_analysis, "methods")
+        imports = names(java_analysis, "imports")
+        superclasses = names(java_analysis, "superclass")
+        interfaces = names(java_analysis, "interfaces")
+        context_parts.append(
+            f"Java code with {len(classes)} classes ({listing(classes)}), "
+            f"{len(methods)} methods ({listing(methods)}), "
+            f"{len(imports)} imported packages ({listing(imports)}), "
+            f"superclasses ({listing(superclasses)}), "
+            f"and interfaces ({listing(interfaces)})."
+        )
+
+    if 'JavaScript' in per_language:
+        javascript_analysis = per_language['JavaScript']
+        classes = names(javascript_analysis, "classes")
+        functions = names(javascript_analysis, "functions")
+        methods = names(javascript_analysis, "methods")
+        imports = names(javascript_analysis, "imports")
+        global_vars = names(javascript_analysis, "global_vars")
+        context_parts.append(
+            f"JavaScript code with {len(classes)} classes ({listing(classes)}), "
+            f"{len(functions)} functions ({listing(functions)}), "
+            f"{len(methods)} methods ({listing(methods)}), "
+            f"{len(global_vars)} global variables ({listing(global_vars)}), "
+            f"and {len(imports)} imported modules ({listing(imports)})."
+        )
+
+    if 'C' in per_language:
+        c_analysis = per_language['C']
+        structs = names(c_analysis, "structs")
+        functions = names(c_analysis, "functions")
+        includes = names(c_analysis, "includes")
+        global_vars = names(c_analysis, "global_vars")
+        context_parts.append(
+            f"C code with {len(structs)} structs ({listing(structs)}), "
+            f"{len(functions)} functions ({listing(functions)}), "
+            f"{len(global_vars)} global variables ({listing(global_vars)}), "
+            f"and {len(includes)} included files ({listing(includes)})."
+        )
+
+    if 'PHP' in per_language:
+        php_analysis = per_language['PHP']
+        classes = names(php_analysis, "classes")
+        functions = names(php_analysis, "functions")
+        methods = names(php_analysis, "methods")
+        uses = names(php_analysis, "uses")
+        parent_classes = names(php_analysis, "parent_classes")
+        interfaces = names(php_analysis, "interfaces")
+        traits = names(php_analysis, "traits")
+        context_parts.append(
+            f"PHP code with {len(classes)} classes ({listing(classes)}), "
+            f"{len(functions)} functions ({listing(functions)}), "
+            f"{len(methods)} methods ({listing(methods)}), "
+            f"{len(uses)} imported namespaces ({listing(uses)}), "
+            f"parent classes ({listing(parent_classes)}), "
+            f"interfaces ({listing(interfaces)}), "
+            f"and traits ({listing(traits)})."
+        )
+
+    return "Project contains: " + " ".join(context_parts) + " This is a multi-language project with the uploaded code structure."
+
+
+def assemble_project(project_path, languages_detected, per_language):
+    """Combine per-language analyzer outputs into the project analysis used by the app."""
+    analysis = {}
+    for language in languages_detected:
+        analysis.update({k: {'language': language, **v} for k, v in per_language[language].items()})
+    return {
+        'languages': list(languages_detected),
+        'per_language': per_language,
+        'analysis': analysis,
+        'errors': file_errors(analysis),
+        'slow_files': slow_files(analysis),
+        'metrics': build_project_metrics(analysis),
+        'clone_clusters': find_clone_clusters(analysis, project_path),
+        'context': build_context(per_language),
+        'explanation': "\n".join(EXPLAINERS[language](project_path, per_language[language]) for language in languages_detected),
+        'purpose': " ".join(PURPOSES[language] for language in languages_detected),
+    }
+
+
+def analyze_project(project_path, languages_detected, on_progress=None, should_stop=None):
+    """Run every detected language analyzer once and return the combined project analysis.
+
+    Returns a dict with 'per_language' (language -> analyzer output), 'analysis' (file path ->
+    elements tagged with their language), 'context' (LLM context string) and the structural
+    'explanation' and 'purpose' strings used by the explain answer. Files that could not be
+    analyzed are listed in 'errors' and files over the slow threshold in 'slow_files'; 'metrics'
+    holds the function metrics as NumPy arrays from build_project_metrics and 'clone_clusters'
+    the near-duplicate functions from find_clone_clusters. Returns None if should_stop()
+    becomes true, which is checked before every file.
+    """
+    per_language = {}
+    for index, language in enumerate(languages_detected):
+        if on_progress is not None:
+            on_progress(index, len(languages_detected), language)
+        per_language[language] = ANALYZERS[language](project_path, should_stop)
+        if per_language[language] is None:
+            return None
+    return assemble_project(project_path, languages_detected, per_language)
+
+
+def decode_source(content):
+    """Decode blob bytes the way the analyzers read files: UTF-8 with universal newlines."""
+    return content.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+
+
+def list_git_sources(repo_path, revision='HEAD'):
+    """Resolve a revision of a local git repository and list its supported source files.
+
+    Returns (commit SHA, [(path, blob SHA, language)], detected languages). Nothing is read from
+    the working tree or the network; everything comes from the repository's object store.
+    """
+    commit = resolve_commit(repo_path, revision)
+    sources = []
+    languages_detected = []
+    for path, blob_sha in list_tree_blobs(repo_path, commit):
+        language = language_for_file(os.path.basename(path))
+        if language is None:
+            continue
+        sources.append((path, blob_sha, language))
+        if language not in languages_detected:
+            languages_detected.append(language)
+    return commit, sources, languages_detected
+
+
+def analyze_git_project(repo_path, sources, languages_detected, cache, on_progress=None, should_stop=None):
+    """Analyze the files of a git revision, parsing only blobs that are not already in the cache.
+
+    File keys are joined onto repo_path so paths relative to it read like the repository layout.
+    Returns the same structure as analyze_project plus 'parsed' and 'reused' blob counts, or None
+    if should_stop() becomes true.
+    """
+    results = {}
+    missing = []
+    paths = {}
+    for path, blob_sha, language in sources:
+        paths.setdefault(blob_sha, path)
+        key = (language, blob_sha)
+        if key in results:
+            continue
+        cached = cache.get(language, blob_sha)
+        results[key] = cached
+        if cached is None:
+            missing.append(key)
+    missing_shas = sorted({blob_sha for _, blob_sha in missing})
+    languages_by_sha = {}
+    for language, blob_sha in missing:
+        languages_by_sha.setdefault(blob_sha, []).append(language)
+    for index, (blob_sha, content) in enumerate(read_blobs(repo_path, missing_shas)):
+        if should_stop is not None and should_stop():
+            return None
+        if on_progress is not None and index % 100 == 0:
+            on_progress(index, len(missing_shas), f"{len(missing_shas)} changed")
+        for language in languages_by_sha[blob_sha]:
+            label = f"{paths[blob_sha]} @ {blob_sha[:12]}"
+            result = analyze_guarded(label, len(content), lambda: decode_source(content),
+                                     FILE_ANALYZERS[language], EMPTY_ANALYSES[language])
+            # Timeouts and size-cap skips are retried next time, under the load and limits of that run
+            if result.get('analysis_error', {}).get('kind') not in UNCACHEABLE_ERRORS:
+                cache.put(language, blob_sha, result)
+            results[(language, blob_sha)] = result
+    per_language = {language: {} for language in languages_detected}
+    for path, blob_sha, language in sources:
+        per_language[language][os.path.join(repo_path, path)] = results[(language, blob_sha)]
+    project = assemble_project(repo_path, languages_detected, per_language)
+    project['parsed'] = len(missing)
+    project['reused'] = len(results) - len(missing)
+    return project
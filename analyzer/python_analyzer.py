@@ -1,5 +1,47 @@
 import ast
-import os
+from analyzer.metrics import count_lines
+from analyzer.clones import python_tokens, shingle_hashes
+from analyzer.summary import clean_doc
+from analyzer.limits import analyze_files
+
+# Nodes that add a decision point to a function's cyclomatic complexity
+DECISION_NODES = (ast.If, ast.IfExp, ast.For, ast.AsyncFor, ast.While, ast.ExceptHandler, ast.Assert)
+# Statements that open a new nesting level
+NESTING_NODES = (ast.If, ast.For, ast.AsyncFor, ast.While, ast.With, ast.AsyncWith, ast.Try)
+
+def function_metrics(node):
+    """Compute cyclomatic complexity, nesting depth, LOC and parameter count for a function node."""
+    complexity = 1
+    max_depth = 0
+    stack = [(child, 0) for child in ast.iter_child_nodes(node)]
+    while stack:
+        current, depth = stack.pop()
+        # Nested functions and classes are measured on their own
+        if isinstance(current, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            continue
+        if isinstance(current, DECISION_NODES):
+            complexity += 1
+        elif isinstance(current, ast.BoolOp):
+            complexity += len(current.values) - 1
+        elif isinstance(current, ast.comprehension):
+            complexity += 1 + len(current.ifs)
+        if isinstance(current, NESTING_NODES):
+            depth += 1
+            max_depth = max(max_depth, depth)
+        for child in ast.iter_child_nodes(current):
+            stack.append((child, depth))
+    args = node.args
+    params = len(args.posonlyargs) + len(args.args) + len(args.kwonlyargs)
+    params += (args.vararg is not None) + (args.kwarg is not None)
+    end_line = getattr(node, 'end_lineno', None) or node.lineno
+    return {
+        'name': node.name,
+        'line': node.lineno,
+        'loc': end_line - node.lineno + 1,
+        'complexity': complexity,
+        'nesting': max_depth,
+        'params': params,
+    }
 
 class CodeAnalyzer(ast.NodeVisitor):
     def __init__(self):
@@ -8,9 +50,26 @@ class CodeAnalyzer(ast.NodeVisitor):
         self.methods = []
         self.global_vars = []
         self.imports = []
+        self.function_metrics = []
+        self.clone_shingles = []
+        self.bases = []
+        self.docs = []
+        self.main_guard = False
+
+    def add_doc(self, node, label=None):
+        doc = clean_doc(ast.get_docstring(node))
+        if doc:
+            self.docs.append(f"{label}: {doc}" if label else doc)
+
+    def visit_Module(self, node):
+        self.add_doc(node)
+        self.generic_visit(node)
 
     def visit_ClassDef(self, node):
         self.classes.append(node.name)
+        for base in node.bases:
+            self.bases.append(f"{node.name} extends {ast.unparse(base)}")
+        self.add_doc(node, node.name)
         self.generic_visit(node)
 
     def visit_FunctionDef(self, node):
@@ -18,6 +77,18 @@ class CodeAnalyzer(ast.NodeVisitor):
             self.methods.append(node.name)
         else:
             self.functions.append(node.name)
+        self.function_metrics.append(function_metrics(node))
+        self.clone_shingles.append(shingle_hashes(python_tokens(node)))
+        self.add_doc(node, node.name)
+        self.generic_visit(node)
+
+    def visit_If(self, node):
+        # `if __name__ == "__main__":` at module level marks a script entry point
+        test = node.test
+        if (isinstance(node.parent, ast.Module) and isinstance(test, ast.Compare)
+                and isinstance(test.left, ast.Name) and test.left.id == '__name__'
+                and any(isinstance(c, ast.Constant) and c.value == '__main__' for c in test.comparators)):
+            self.main_guard = True
         self.generic_visit(node)
 
     def visit_Assign(self, node):
@@ -37,46 +108,57 @@ class CodeAnalyzer(ast.NodeVisitor):
             self.imports.append(f"{node.module}.{alias.name}" if node.module else alias.name)
         self.generic_visit(node)
 
-def analyze_python_project(project_path):
-    """Analyze a Python project and return a dictionary with extracted elements."""
-    analysis = {}
+def empty_python_analysis(loc=0):
+    """Return a Python file analysis with no elements; it also stands in for files that fail to analyze."""
+    return {
+        'classes': [],
+        'functions': [],
+        'methods': [],
+        'global_vars': [],
+        'imports': [],
+        'function_metrics': [],
+        'clone_shingles': [],
+        'bases': [],
+        'docs': [],
+        'main_guard': False,
+        'loc': loc
+    }
+
+def analyze_python_file(code):
+    """Analyze the source of a single Python file and return a dictionary with extracted elements.
+
+    Raises SyntaxError for invalid source and RecursionError for pathologically nested code; the
+    project walk reports both per file.
+    """
     analyzer = CodeAnalyzer()
+    tree = ast.parse(code)
+    # Add parent references
+    for node in ast.walk(tree):
+        for child in ast.iter_child_nodes(node):
+            child.parent = node
+    analyzer.visit(tree)
+    return {
+        'classes': analyzer.classes,
+        'functions': analyzer.functions,
+        'methods': analyzer.methods,
+        'global_vars': analyzer.global_vars,
+        'imports': analyzer.imports,
+        'function_metrics': analyzer.function_metrics,
+        'clone_shingles': analyzer.clone_shingles,
+        'bases': analyzer.bases,
+        'docs': analyzer.docs,
+        'main_guard': analyzer.main_guard,
+        'loc': count_lines(code)
+    }
+
+def analyze_python_project(project_path, should_stop=None):
+    """Analyze a Python project and return a dictionary with extracted elements."""
+    return analyze_files(project_path, ('.py',), analyze_python_file, empty_python_analysis, should_stop)
 
-    for root, _, files in os.walk(project_path):
-        for file in files:
-            if file.endswith('.py'):
-                file_path = os.path.join(root, file)
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    code = f.read()
-                try:
-                    tree = ast.parse(code)
-                    # Add parent references
-                    for node in ast.walk(tree):
-                        for child in ast.iter_child_nodes(node):
-                            child.parent = node
-                    analyzer.visit(tree)
-                    analysis[file_path] = {
-                        'classes': analyzer.classes,
-                        'functions': analyzer.functions,
-                        'methods': analyzer.methods,
-                        'global_vars': analyzer.global_vars,
-                        'imports': analyzer.imports
-                    }
-                    # Reset analyzer for next file
-                    analyzer = CodeAnalyzer()
-                except SyntaxError:
-                    analysis[file_path] = {
-                        'classes': [],
-                        'functions': [],
-                        'methods': [],
-                        'global_vars': [],
-                        'imports': []
-                    }
-    return analysis
-
-def explain_python_code(project_path):
+def explain_python_code(project_path, analysis=None):
     """Generate a summary of the Python project structure."""
-    analysis = analyze_python_project(project_path)
+    if analysis is None:
+        analysis = analyze_python_project(project_path)
     total_classes = sum(len(data['classes']) for data in analysis.values())
     total_functions = sum(len(data['functions']) for data in analysis.values())
     total_methods = sum(len(data['methods']) for data in analysis.values())
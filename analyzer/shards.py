@@ -0,0 +1,418 @@
+"""Sharded analysis of large projects across worker processes and hosts.
+
+A coordinator plans a queue: the file manifest is split into shards by content hash and stored in
+a SQLite file together with the source location. Workers on any host that can open the queue file
+and read the sources (a clone of the repository, or a shared directory) pull shards, analyze them
+and write per-file results back. Merging assembles the same project analysis analyze_project or
+analyze_git_project would produce on a single host.
+
+    python -m analyzer.shards plan --queue q.db --repo /path/to/repo --revision main
+    python -m analyzer.shards work --queue q.db --processes 8 [--repo /local/clone]
+    python -m analyzer.shards status --queue q.db
+    python -m analyzer.shards merge --queue q.db --output project.pickle
+
+`run` does all of the above with local worker processes.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import math
+import multiprocessing
+import os
+import pickle
+import socket
+import sqlite3
+import time
+from contextlib import contextmanager
+from analyzer.project import (language_for_file, FILE_ANALYZERS, EMPTY_ANALYSES, assemble_project, list_git_sources,
+                              decode_source)
+from analyzer.git_source import read_blobs
+from analyzer.limits import analyze_guarded, FileAnalysisError
+
+logger = logging.getLogger(__name__)
+
+SHARD_TARGET_FILES = 500   # Unique files per shard when the shard count is not given
+LEASE_SECONDS = 300.0      # A running shard without a heartbeat for this long is handed to another worker
+HEARTBEAT_SECONDS = 30.0   # How often a worker renews the lease on its shard
+MAX_ATTEMPTS = 3           # Attempts per shard before it is marked failed
+POLL_SECONDS = 2.0         # Idle workers and the local runner poll the queue this often
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS manifest (
+    position INTEGER PRIMARY KEY, path TEXT NOT NULL, sha TEXT NOT NULL, language TEXT NOT NULL, size INTEGER);
+CREATE TABLE IF NOT EXISTS units (
+    language TEXT NOT NULL, sha TEXT NOT NULL, path TEXT NOT NULL, size INTEGER, shard INTEGER NOT NULL,
+    PRIMARY KEY (language, sha));
+CREATE INDEX IF NOT EXISTS units_by_shard ON units (shard);
+CREATE TABLE IF NOT EXISTS shards (
+    id INTEGER PRIMARY KEY, files INTEGER NOT NULL, status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0, worker TEXT, heartbeat REAL, error TEXT, finished_at REAL);
+CREATE TABLE IF NOT EXISTS results (
+    language TEXT NOT NULL, sha TEXT NOT NULL, data BLOB NOT NULL, PRIMARY KEY (language, sha));
+"""
+
+
+def connect(queue_path):
+    """Open a queue database; transactions are explicit, see transaction()."""
+    conn = sqlite3.connect(queue_path, timeout=60, isolation_level=None)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+@contextmanager
+def transaction(conn):
+    """Hold the queue's write lock for the duration of the block."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def read_meta(conn):
+    meta = {key: json.loads(value) for key, value in conn.execute("SELECT key, value FROM meta")}
+    if not meta:
+        raise ValueError("The queue has not been planned yet")
+    return meta
+
+
+def git_blob_sha(content):
+    """Content hash of a file, identical to the blob SHA git would give it."""
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+
+def list_directory_sources(root):
+    """Return ([(relative path, content SHA, language, size)], detected languages) for a directory.
+
+    Files are listed in os.walk order, the order the single-host analyzers visit them in.
+    """
+    manifest = []
+    languages_detected = []
+    for walk_root, _, files in os.walk(root):
+        for file in files:
+            language = language_for_file(file)
+            if language is None:
+                continue
+            file_path = os.path.join(walk_root, file)
+            with open(file_path, 'rb') as f:
+                content = f.read()
+            manifest.append((os.path.relpath(file_path, root), git_blob_sha(content), language, len(content)))
+            if language not in languages_detected:
+                languages_detected.append(language)
+    return manifest, languages_detected
+
+
+def plan_queue(queue_path, repo_path=None, revision="HEAD", directory=None, shards=None):
+    """Create the shard queue for a git revision or a directory and return the number of shards.
+
+    Each distinct (language, content SHA) is analyzed once, in the shard its hash falls into, so
+    duplicate files across the tree cost nothing extra.
+    """
+    if repo_path is not None:
+        root = os.path.abspath(repo_path)
+        commit, sources, languages_detected = list_git_sources(root, revision)
+        manifest = [(path, sha, language, None) for path, sha, language in sources]
+        meta = {'kind': 'git', 'root': root, 'commit': commit}
+    else:
+        root = os.path.abspath(directory)
+        manifest, languages_detected = list_directory_sources(root)
+        meta = {'kind': 'directory', 'root': root}
+    meta['languages'] = languages_detected
+
+    units = {}
+    for path, sha, language, size in manifest:
+        units.setdefault((language, sha), (path, size))
+    shard_count = shards or max(1, math.ceil(len(units) / SHARD_TARGET_FILES))
+    unit_rows = [(language, sha, path, size, int(sha[:8], 16) % shard_count)
+                 for (language, sha), (path, size) in units.items()]
+    files_per_shard = {}
+    for row in unit_rows:
+        files_per_shard[row[4]] = files_per_shard.get(row[4], 0) + 1
+
+    conn = connect(queue_path)
+    try:
+        with transaction(conn):
+            if conn.execute("SELECT COUNT(*) FROM meta").fetchone()[0]:
+                raise ValueError(f"Queue {queue_path} is already planned")
+            conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)",
+                             [(key, json.dumps(value)) for key, value in meta.items()])
+            conn.executemany("INSERT INTO manifest (position, path, sha, language, size) VALUES (?, ?, ?, ?, ?)",
+                             [(position, *entry) for position, entry in enumerate(manifest)])
+            conn.executemany("INSERT INTO units (language, sha, path, size, shard) VALUES (?, ?, ?, ?, ?)", unit_rows)
+            conn.executemany("INSERT INTO shards (id, files) VALUES (?, ?)", sorted(files_per_shard.items()))
+    finally:
+        conn.close()
+    return len(files_per_shard)
+
+
+def claim_shard(conn, worker_id):
+    """Take the next pending shard, or one whose worker stopped renewing its lease."""
+    now = time.time()
+    with transaction(conn):
+        conn.execute(
+            "UPDATE shards SET status = 'failed', worker = NULL, "
+            "error = COALESCE(error, 'worker stopped responding') "
+            "WHERE status = 'running' AND heartbeat < ? AND attempts >= ?",
+            (now - LEASE_SECONDS, MAX_ATTEMPTS))
+        row = conn.execute(
+            "SELECT id FROM shards WHERE status = 'pending' OR (status = 'running' AND heartbeat < ?) "
+            "ORDER BY attempts, id LIMIT 1", (now - LEASE_SECONDS,)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE shards SET status = 'running', worker = ?, heartbeat = ?, attempts = attempts + 1 "
+                     "WHERE id = ?", (worker_id, now, row[0]))
+    return row[0]
+
+
+def release_shard(conn, shard, worker_id, error):
+    """Return a failed shard to the queue, or mark it failed once it is out of attempts."""
+    with transaction(conn):
+        conn.execute(
+            "UPDATE shards SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "worker = NULL, error = ? WHERE id = ? AND worker = ?",
+            (MAX_ATTEMPTS, error, shard, worker_id))
+
+
+def complete_shard(conn, shard, worker_id, results):
+    with transaction(conn):
+        conn.executemany("INSERT OR REPLACE INTO results (language, sha, data) VALUES (?, ?, ?)",
+                         [(language, sha, pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+                          for (language, sha), result in results.items()])
+        conn.execute("UPDATE shards SET status = 'done', error = NULL, finished_at = ? WHERE id = ? AND worker = ?",
+                     (time.time(), shard, worker_id))
+
+
+def analyze_shard(conn, meta, root, shard, worker_id):
+    """Analyze every unit of a shard and return {(language, sha): file analysis}."""
+    units = conn.execute("SELECT language, sha, path, size FROM units WHERE shard = ? ORDER BY sha, language",
+                         (shard,)).fetchall()
+    last_heartbeat = time.monotonic()
+
+    def heartbeat():
+        nonlocal last_heartbeat
+        if time.monotonic() - last_heartbeat > HEARTBEAT_SECONDS:
+            conn.execute("UPDATE shards SET heartbeat = ? WHERE id = ? AND worker = ?", (time.time(), shard, worker_id))
+            last_heartbeat = time.monotonic()
+
+    results = {}
+    if meta['kind'] == 'git':
+        units_by_sha = {}
+        for language, sha, path, _ in units:
+            units_by_sha.setdefault(sha, []).append((language, path))
+        for sha, content in read_blobs(root, sorted(units_by_sha)):
+            for language, path in units_by_sha[sha]:
+                results[(language, sha)] = analyze_guarded(
+                    f"{path} @ {sha[:12]}", len(content), lambda: decode_source(content),
+                    FILE_ANALYZERS[language], EMPTY_ANALYSES[language])
+            heartbeat()
+    else:
+        for language, sha, path, size in units:
+            def read_code(path=path, sha=sha):
+                with open(os.path.join(root, path), 'rb') as f:
+                    content = f.read()
+                if git_blob_sha(content) != sha:
+                    raise FileAnalysisError('changed', "file changed after the queue was planned")
+                return decode_source(content)
+
+            results[(language, sha)] = analyze_guarded(os.path.join(root, path), size, read_code,
+                                                       FILE_ANALYZERS[language], EMPTY_ANALYSES[language])
+            heartbeat()
+    return results
+
+
+def run_worker(queue_path, repo_path=None, worker_id=None, should_stop=None):
+    """Pull and analyze shards until the queue is drained; returns the number of shards completed.
+
+    repo_path points a worker on another host at its own clone or mount of the planned source.
+    A worker whose shard fails hands it back for a retry and moves on to the next one.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    conn = connect(queue_path)
+    completed = 0
+    try:
+        meta = read_meta(conn)
+        root = os.path.abspath(repo_path) if repo_path else meta['root']
+        while should_stop is None or not should_stop():
+            shard = claim_shard(conn, worker_id)
+            if shard is None:
+                running = conn.execute("SELECT COUNT(*) FROM shards WHERE status = 'running'").fetchone()[0]
+                if not running:
+                    break
+                # Wait in case a running shard is handed back or its worker disappears
+                time.sleep(POLL_SECONDS)
+                continue
+            started = time.monotonic()
+            try:
+                results = analyze_shard(conn, meta, root, shard, worker_id)
+            except Exception as e:
+                logger.warning("Shard %s failed on %s: %s", shard, worker_id, e)
+                release_shard(conn, shard, worker_id, f"{type(e).__name__}: {e}")
+                continue
+            complete_shard(conn, shard, worker_id, results)
+            completed += 1
+            logger.info("Shard %s (%d files) done on %s in %.1fs", shard, len(results), worker_id,
+                        time.monotonic() - started)
+    finally:
+        conn.close()
+    return completed
+
+
+def shard_progress(queue_path):
+    """Return shard counts by status and the number of analyzed files out of the total."""
+    conn = connect(queue_path)
+    try:
+        progress = {'pending': 0, 'running': 0, 'done': 0, 'failed': 0}
+        for status, count in conn.execute("SELECT status, COUNT(*) FROM shards GROUP BY status"):
+            progress[status] = count
+        progress['shards'] = sum(progress.values())
+        progress['files'] = conn.execute("SELECT COUNT(*) FROM units").fetchone()[0]
+        progress['files_done'] = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        progress['errors'] = [
+            {'shard': shard, 'attempts': attempts, 'error': error}
+            for shard, attempts, error in conn.execute(
+                "SELECT id, attempts, error FROM shards WHERE error IS NOT NULL ORDER BY id")
+        ]
+    finally:
+        conn.close()
+    return progress
+
+
+def merge_results(queue_path, repo_path=None):
+    """Assemble the shard results into one project analysis.
+
+    Files are keyed and ordered exactly as on a single host, so the result matches analyze_project
+    (directories) or analyze_git_project (git revisions) apart from timings. Files whose shard
+    failed appear in 'errors' with kind 'shard_failed'.
+    """
+    conn = connect(queue_path)
+    try:
+        meta = read_meta(conn)
+        root = os.path.abspath(repo_path) if repo_path else meta['root']
+        shard_errors = dict(conn.execute(
+            "SELECT units.language || ':' || units.sha, shards.error FROM units JOIN shards ON shards.id = units.shard "
+            "WHERE shards.status != 'done'"))
+        results = {(language, sha): pickle.loads(data)
+                   for language, sha, data in conn.execute("SELECT language, sha, data FROM results")}
+        per_language = {language: {} for language in meta['languages']}
+        for path, sha, language in conn.execute("SELECT path, sha, language FROM manifest ORDER BY position"):
+            result = results.get((language, sha))
+            if result is None:
+                result = EMPTY_ANALYSES[language]()
+                result['analysis_error'] = {
+                    'kind': 'shard_failed',
+                    'message': shard_errors.get(f"{language}:{sha}") or "shard was not analyzed",
+                }
+            per_language[language][os.path.join(root, path)] = result
+    finally:
+        conn.close()
+    project = assemble_project(root, meta['languages'], per_language)
+    project['commit'] = meta.get('commit')
+    project['shards'] = shard_progress(queue_path)
+    return project
+
+
+def run_workers(queue_path, processes=None, repo_path=None, on_progress=None):
+    """Drain a planned queue with local worker processes, passing shard progress to on_progress.
+
+    Workers on other hosts may pull from the same queue at the same time.
+    """
+    processes = processes or os.cpu_count() or 1
+    workers = [multiprocessing.Process(target=run_worker, args=(queue_path, repo_path), daemon=True)
+               for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    while any(worker.is_alive() for worker in workers):
+        if on_progress is not None:
+            on_progress(shard_progress(queue_path))
+        time.sleep(POLL_SECONDS)
+    for worker in workers:
+        worker.join()
+    # Finish anything left behind by a worker that died, in this process
+    run_worker(queue_path, repo_path)
+    if on_progress is not None:
+        on_progress(shard_progress(queue_path))
+
+
+def analyze_sharded(queue_path, processes=None, repo_path=None, on_progress=None):
+    """Analyze a planned queue with local worker processes and return the merged project analysis."""
+    run_workers(queue_path, processes, repo_path, on_progress)
+    return merge_results(queue_path, repo_path)
+
+
+def print_progress(progress):
+    print(f"Shards: {progress['done']}/{progress['shards']} done, {progress['running']} running, "
+          f"{progress['failed']} failed; files: {progress['files_done']}/{progress['files']}", flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m analyzer.shards", description="Sharded project analysis.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_source(command):
+        source = command.add_mutually_exclusive_group(required=True)
+        source.add_argument("--repo", help="local git repository to analyze")
+        source.add_argument("--dir", help="directory to analyze")
+        command.add_argument("--revision", default="HEAD", help="commit, branch or tag (with --repo)")
+        command.add_argument("--shards", type=int, help="number of shards (default: one per "
+                             f"{SHARD_TARGET_FILES} unique files)")
+
+    plan = commands.add_parser("plan", help="split a project into shards on a new queue")
+    plan.add_argument("--queue", required=True)
+    add_source(plan)
+
+    work = commands.add_parser("work", help="pull and analyze shards until the queue is drained")
+    work.add_argument("--queue", required=True)
+    work.add_argument("--repo", help="this host's copy of the planned source, if it lives elsewhere")
+    work.add_argument("--processes", type=int, default=1)
+
+    status = commands.add_parser("status", help="show shard progress")
+    status.add_argument("--queue", required=True)
+
+    merge = commands.add_parser("merge", help="combine shard results into one project analysis")
+    merge.add_argument("--queue", required=True)
+    merge.add_argument("--repo", help="path to key files under instead of the planned source path")
+    merge.add_argument("--output", required=True, help="pickle file for the merged project analysis")
+
+    run = commands.add_parser("run", help="plan, analyze with local processes and merge")
+    run.add_argument("--queue", required=True)
+    add_source(run)
+    run.add_argument("--processes", type=int)
+    run.add_argument("--output", required=True, help="pickle file for the merged project analysis")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    if args.command in ("plan", "run"):
+        try:
+            count = plan_queue(args.queue, repo_path=args.repo, revision=args.revision, directory=args.dir,
+                               shards=args.shards)
+        except ValueError as e:
+            parser.error(str(e))
+        print(f"Planned {count} shards in {args.queue}", flush=True)
+    if args.command == "work":
+        if args.processes > 1:
+            run_workers(args.queue, args.processes, args.repo, print_progress)
+        else:
+            run_worker(args.queue, args.repo)
+        print_progress(shard_progress(args.queue))
+    elif args.command == "status":
+        progress = shard_progress(args.queue)
+        print_progress(progress)
+        for error in progress['errors']:
+            print(f"  shard {error['shard']} (attempt {error['attempts']}): {error['error']}")
+    elif args.command in ("merge", "run"):
+        if args.command == "merge":
+            project = merge_results(args.queue, args.repo)
+        else:
+            project = analyze_sharded(args.queue, args.processes, None, print_progress)
+        with open(args.output, 'wb') as f:
+            pickle.dump(project, f, protocol=pickle.HIGHEST_PROTOCOL)
+        print(f"Merged {len(project['analysis'])} files ({len(project['errors'])} with errors) into {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import os
+import re
+from collections import Counter
+
+MAX_DOC_LENGTH = 160
+SYMBOL_KEYS = ('classes', 'structs', 'functions', 'methods')
+INHERITANCE_KEYS = ('superclass', 'parent_classes', 'bases')
+IMPORT_KEYS = ('imports', 'includes', 'uses')
+ENTRY_POINT_FILES = {'main.py', '__main__.py', 'app.py', 'manage.py', 'index.js', 'server.js', 'main.js',
+                     'app.js', 'index.php', 'main.c'}
+STOP_WORDS = {'the', 'and', 'for', 'what', 'which', 'how', 'does', 'this', 'that', 'with', 'from', 'are',
+              'code', 'project', 'about', 'there', 'where', 'when', 'who', 'why', 'can', 'you', 'tell'}
+
+COMMENT_MARKERS = re.compile(r'^\s*(/\*\*?|\*/|\*|//+|#+)\s?')
+
+
+def clean_doc(text):
+    """Reduce a docstring or comment to its first meaningful line, without comment markers."""
+    if not text:
+        return None
+    for line in text.splitlines():
+        line = COMMENT_MARKERS.sub('', line).replace('*/', '').strip()
+        # Skip blank lines, decorations and javadoc/phpdoc tags
+        if line and not line.startswith('@') and re.search(r'[A-Za-z]', line):
+            return line if len(line) <= MAX_DOC_LENGTH else line[:MAX_DOC_LENGTH - 3] + '...'
+    return None
+
+
+def leading_comment(node, code):
+    """Return the cleaned doc comment directly above a tree-sitter node, if any."""
+    while node is not None:
+        sibling = node.prev_named_sibling
+        if sibling is not None:
+            if 'comment' in sibling.type:
+                return clean_doc(code[sibling.start_byte:sibling.end_byte])
+            return None
+        # `export function f()` keeps its comment above the export statement
+        if node.parent is not None and node.parent.type in ('export_statement', 'decorated_definition'):
+            node = node.parent
+            continue
+        return None
+    return None
+
+
+def record_doc(docs, node, code, label):
+    """Append the doc comment above a tree-sitter node to docs, labelled with its symbol name."""
+    doc = leading_comment(node, code)
+    if doc:
+        docs.append(f"{label}: {doc}")
+
+
+def header_comment(root_node, code):
+    """Return the cleaned comment at the top of a file, skipping the PHP open tag."""
+    for child in root_node.named_children:
+        if child.type in ('php_tag', 'text'):
+            continue
+        if 'comment' in child.type:
+            return clean_doc(code[child.start_byte:child.end_byte])
+        return None
+    return None
+
+
+def entry_points(file_path, data):
+    """Return the reasons a file looks like an entry point."""
+    reasons = []
+    if data.get('main_guard'):
+        reasons.append('`__main__` guard')
+    if 'main' in data.get('functions', []) or 'main' in data.get('methods', []):
+        reasons.append('`main()`')
+    if os.path.basename(file_path) in ENTRY_POINT_FILES:
+        reasons.append('conventional entry file name')
+    return reasons
+
+
+def query_terms(query):
+    """Significant lowercase words of a question."""
+    return {word for word in re.findall(r'[a-z_][a-z0-9_]{2,}', query.lower()) if word not in STOP_WORDS}
+
+
+def extractive_summary(project, project_path, query=None, top_n=5):
+    """Build a deterministic markdown summary of a project straight from the analysis data.
+
+    Used when the LLM is saturated or unavailable: it covers the top modules by symbol count,
+    likely entry points, the inheritance hierarchy, dominant imports and documentation pulled
+    from docstrings and comments. With a query, symbols and docs matching its words are listed first.
+    """
+    analysis = project['analysis']
+
+    def relative(file_path):
+        return os.path.relpath(file_path, project_path)
+
+    files_per_language = Counter(data.get('language', '') for data in analysis.values())
+    total_loc = sum(data.get('loc', 0) for data in analysis.values())
+    lines = [
+        "- **Languages:** " + ", ".join(f"{language} ({count} files)" for language, count in files_per_language.most_common())
+        + f"; {len(analysis)} files, {total_loc} lines."
+    ]
+
+    symbol_counts = []
+    for file_path, data in analysis.items():
+        counts = {key: len(data.get(key, [])) for key in SYMBOL_KEYS if data.get(key)}
+        if counts:
+            symbol_counts.append((sum(counts.values()), file_path, counts))
+    symbol_counts.sort(key=lambda item: (-item[0], item[1]))
+    if symbol_counts:
+        lines.append("- **Top modules by symbol count:** " + "; ".join(
+            f"`{relative(file_path)}` ({total}: " + ", ".join(f"{count} {key}" for key, count in counts.items()) + ")"
+            for total, file_path, counts in symbol_counts[:top_n]
+        ))
+
+    entries = [(file_path, entry_points(file_path, data)) for file_path, data in analysis.items()]
+    entries = [(file_path, reasons) for file_path, reasons in entries if reasons]
+    entries.sort(key=lambda item: (-len(item[1]), item[0]))
+    lines.append("- **Entry points:** " + ("; ".join(
+        f"`{relative(file_path)}` ({', '.join(reasons)})" for file_path, reasons in entries[:top_n]
+    ) if entries else "none found."))
+
+    inheritance = [relation for data in analysis.values() for key in INHERITANCE_KEYS
+                   for relation in data.get(key, []) if ' extends ' in relation]
+    lines.append("- **Inheritance:** " + ("; ".join(inheritance[:top_n * 3]) if inheritance else "no class hierarchy found."))
+
+    imports = Counter(item for data in analysis.values() for key in IMPORT_KEYS for item in set(data.get(key, [])))
+    if imports:
+        lines.append("- **Dominant imports:** " + ", ".join(
+            f"`{name}` ({count} files)" for name, count in imports.most_common(top_n * 2)))
+
+    docs = [(file_path, doc) for file_path, data in analysis.items() for doc in data.get('docs', [])]
+    if docs:
+        lines.append("- **From docstrings and comments:**")
+        lines.extend(f"  - `{relative(file_path)}`: {doc}" for file_path, doc in docs[:top_n * 2])
+
+    if query:
+        terms = query_terms(query)
+        matches = []
+        for file_path, data in analysis.items():
+            candidates = [name for key in SYMBOL_KEYS for name in data.get(key, [])] + data.get('docs', [])
+            for text in candidates:
+                if any(term in text.lower() for term in terms):
+                    matches.append(f"`{relative(file_path)}`: {text}")
+            if any(term in relative(file_path).lower() for term in terms):
+                matches.append(f"`{relative(file_path)}` (file name)")
+        if matches:
+            lines.insert(0, "**Matches for your question:**\n" + "\n".join(f"- {match}" for match in matches[:top_n * 3]) + "\n")
+
+    return "\n".join(lines)
@@ -1,400 +1,423 @@
 import streamlit as st
-from analyzer.python_analyzer import analyze_python_project, explain_python_code
-from analyzer.java_analyzer import analyze_java_project, explain_java_code
-from analyzer.javascript_analyzer import analyze_javascript_project, explain_javascript_code
-from analyzer.c_analyzer import analyze_c_project, explain_c_code
-from analyzer.php_analyzer import analyze_php_project, explain_php_code
+from analyzer.metrics import top_functions, largest_files, metric_percentiles, directory_aggregates
+from analyzer.git_source import BlobAnalysisCache, resolve_commit
+from analyzer.summary import extractive_summary
+from analyzer.listing import element_listing, file_listing, module_listing
+from analyzer.limits import SLOW_FILE_SECONDS
+from ollama_client import query_ollama_or_fallback
+from pipeline import ProjectPipeline, EXPLAIN_QUERIES, build_explain_prompt
+from workspace import UploadWorkspace
 import os
-import zipfile
-import tempfile
 import re
-import requests
 import uuid
 
 st.set_page_config(page_title="Code Analyzer with Ollama", layout="wide")
 st.title("🛠 Code Analyzer for Python, Java, JavaScript, C, and PHP with Ollama")
 
-# Ollama configuration
-OLLAMA_URL = "http://localhost:11434/api/generate"
-OLLAMA_MODEL = "codellama:7b"
+source_mode = st.radio("Project source", ["Upload ZIP", "Local git repository"], horizontal=True)
+uploaded_file = None
+repo_path = None
+if source_mode == "Upload ZIP":
+    uploaded_file = st.file_uploader("Upload a ZIP file containing your project", type=["zip"])
+else:
+    repo_path = st.text_input("Path to a git repository on this host").strip() or None
+    revision = st.text_input("Commit, branch or tag", value="HEAD").strip() or "HEAD"
+
+@st.cache_resource
+def get_blob_cache():
+    """Per-blob analysis cache shared by every session, so unchanged files are parsed once."""
+    return BlobAnalysisCache()
+
+@st.cache_resource
+def get_workspace():
+    """Content-addressed store of extracted uploads shared by every session."""
+    return UploadWorkspace()
 
-uploaded_file = st.file_uploader("Upload a ZIP file containing your project", type=["zip"])
+def get_pipeline(source_key, start_pipeline):
+    """Return the background pipeline for the current source, restarting it when the source changes."""
+    pipeline = st.session_state.get("pipeline")
+    if pipeline is not None and pipeline.upload_key != source_key:
+        pipeline.cancel()
+        pipeline = None
+    if pipeline is None:
+        pipeline = start_pipeline()
+        st.session_state["pipeline"] = pipeline
+    return pipeline
 
-def query_ollama(prompt):
-    """Send query to Ollama and return response."""
+def get_upload_pipeline(uploaded_file):
+    upload_key = getattr(uploaded_file, "file_id", None) or f"{uploaded_file.name}:{uploaded_file.size}"
+    return get_pipeline(upload_key, lambda: ProjectPipeline(
+        upload_key, bytes(uploaded_file.getbuffer()), workspace=get_workspace()).start())
+
+def get_git_pipeline(repo_path, revision):
+    repo_path = os.path.abspath(os.path.expanduser(repo_path))
     try:
-        response = requests.post(
-            OLLAMA_URL,
-            json={
-                "model": OLLAMA_MODEL,
-                "prompt": prompt,
-                "stream": False,
-                "options": {"temperature": 0.3}
-            }
-        )
-        response.raise_for_status()
-        return response.json().get("response", "Error: No response from Ollama")
-    except requests.exceptions.HTTPError as e:
-        return f"Error querying Ollama: {str(e)}. Ensure model `{OLLAMA_MODEL}` is listed in `ollama list` and server is running (`ollama serve`)."
-    except requests.exceptions.ConnectionError:
-        return "Error: Ollama server not running at localhost:11434. Start it with `ollama serve`."
-    except Exception as e:
-        return f"Unexpected error querying Ollama: {str(e)}. Check server and model availability."
+        # Key on the resolved commit so moving a branch starts a new, incremental analysis
+        commit = resolve_commit(repo_path, revision)
+    except Exception:
+        commit = revision
+    source_key = f"git:{repo_path}@{commit}"
+    return get_pipeline(source_key, lambda: ProjectPipeline(
+        source_key, repo_path=repo_path, revision=commit, cache=get_blob_cache()).start())
 
-if uploaded_file is not None:
-    with tempfile.TemporaryDirectory() as temp_dir:
-        # Save the uploaded ZIP file to the temporary directory
-        zip_path = os.path.join(temp_dir, uploaded_file.name)
-        with open(zip_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
+PAGE_SIZES = [25, 50, 100, 250]
+NO_SORT = "(source order)"
+NO_GROUP = "(none)"
 
-        # Extract the ZIP file
-        try:
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(temp_dir)
-            st.success(f"ZIP file extracted to temporary directory: {temp_dir}")
-        except zipfile.BadZipFile:
-            st.error("Invalid ZIP file. Please upload a valid ZIP file.")
-            st.stop()
+def show_listing(result_set, key, languages):
+    """Render one page of a listing with filter, sort and grouping controls and a full CSV export.
 
-        # Detect languages by scanning file extensions
-        languages_detected = []
-        python_files = []
-        java_files = []
-        javascript_files = []
-        c_files = []
-        php_files = []
-        for root, _, files in os.walk(temp_dir):
-            for file in files:
-                if file.endswith('.py'):
-                    python_files.append(os.path.join(root, file))
-                    if 'Python' not in languages_detected:
-                        languages_detected.append('Python')
-                elif file.endswith('.java'):
-                    java_files.append(os.path.join(root, file))
-                    if 'Java' not in languages_detected:
-                        languages_detected.append('Java')
-                elif file.endswith('.js'):
-                    javascript_files.append(os.path.join(root, file))
-                    if 'JavaScript' not in languages_detected:
-                        languages_detected.append('JavaScript')
-                elif file.endswith(('.c', '.h')):
-                    c_files.append(os.path.join(root, file))
-                    if 'C' not in languages_detected:
-                        languages_detected.append('C')
-                elif file.endswith('.php'):
-                    php_files.append(os.path.join(root, file))
-                    if 'PHP' not in languages_detected:
-                        languages_detected.append('PHP')
+    Filtering, sorting, grouping and paging run on the server over the lazy result set, so only
+    the visible page is sent to the browser. Returns the rows of the visible page.
+    """
+    columns = result_set.columns
+    filter_col, language_col, sort_col, group_col, size_col = st.columns(5)
+    result_set = result_set.search(filter_col.text_input("Filter", key=f"{key}_filter"))
+    if 'language' in columns:
+        result_set = result_set.where_in('language', language_col.multiselect("Language", languages, key=f"{key}_language"))
+    sort_column = sort_col.selectbox("Sort by", [NO_SORT, *columns], key=f"{key}_sort")
+    descending = sort_col.checkbox("Descending", key=f"{key}_descending")
+    group_column = group_col.selectbox("Group by", [NO_GROUP, *[c for c in ('language', 'file') if c in columns]],
+                                       key=f"{key}_group")
+    page_size = size_col.selectbox("Rows per page", PAGE_SIZES, key=f"{key}_page_size")
 
-        if not languages_detected:
-            st.error("No supported source files (.py, .java, .js, .c, .h, .php) found in the project.")
-            st.stop()
+    sort_columns = [c for c in (group_column, sort_column) if c not in (NO_SORT, NO_GROUP)]
+    if sort_columns:
+        # Without a chosen column the listing keeps the order it was passed in
+        result_set = result_set.sort_by(*dict.fromkeys(sort_columns), descending=descending)
+    if group_column != NO_GROUP:
+        groups = result_set.group_counts(group_column)
+        st.caption(f"{len(groups)} groups by {group_column}" + (f"; largest {page_size} shown" if len(groups) > page_size else ""))
+        st.dataframe([{group_column: value, 'rows': count} for value, count in groups[:page_size]], hide_index=True)
 
-        st.info(f"Detected languages: {', '.join(languages_detected)}")
+    total = result_set.count()
+    pages = max(1, -(-total // page_size))
+    page_number = min(int(st.number_input(f"Page (of {pages})", min_value=1, step=1, key=f"{key}_page")), pages)
+    rows = result_set.page(page_number - 1, page_size)
+    start = (page_number - 1) * page_size
+    st.dataframe(rows, hide_index=True)
+    st.caption(f"Showing {start + 1 if rows else 0}–{start + len(rows)} of {total}")
+    st.download_button("Download full listing (CSV)", data=result_set.csv_export, file_name=f"{key}.csv",
+                       mime="text/csv", key=f"{key}_download")
+    return rows
 
-        query = st.text_input(
-            "Ask a question (e.g., classes, structs, traits, how many functions, list methods, what does code do, how many libraries):")
+def model_status(pipeline):
+    if pipeline.model_warm is None:
+        return "Loading the Ollama model." if not pipeline.settled else "Ollama model warm-up did not finish."
+    return "Ollama model is loaded." if pipeline.model_warm else "Ollama model could not be loaded; questions use the fast summary while it stays unavailable."
 
-        if query:
-            q = query.lower().strip()
-            project_path = temp_dir
+def show_pipeline_status(pipeline):
+    """Progress of the background work; polls only while it is still running."""
+    if not pipeline.settled:
+        show_pipeline_progress(pipeline)
+    elif pipeline.explanation is not None:
+        st.caption(f"✅ Background analysis complete. Project explanation is ready. {model_status(pipeline)}")
+    else:
+        st.caption(f"✅ Background analysis complete. {model_status(pipeline)}")
 
-            # Perform analysis for each detected language
-            analysis = {}
-            python_analysis = {}
-            java_analysis = {}
-            javascript_analysis = {}
-            c_analysis = {}
-            php_analysis = {}
-            context_parts = []
+@st.fragment(run_every=1.0)
+def show_pipeline_progress(pipeline):
+    """Live progress of the background pipeline and model warm-up.
 
-            if 'Python' in languages_detected:
-                python_analysis = analyze_python_project(project_path)
-                analysis.update({k: {'language': 'Python', **v} for k, v in python_analysis.items()})
-                classes = [c for data in python_analysis.values() for c in data["classes"]]
-                functions = [f for data in python_analysis.values() for f in data["functions"]]
-                methods = [m for data in python_analysis.values() for m in data["methods"]]
-                imports = [i for data in python_analysis.values() for i in data["imports"]]
-                global_vars = [g for data in python_analysis.values() for g in data["global_vars"]]
-                context_parts.append(
-                    f"Python code with {len(classes)} classes ({', '.join(classes) if classes else 'none'}), "
-                    f"{len(functions)} functions ({', '.join(functions) if functions else 'none'}), "
-                    f"{len(methods)} methods ({', '.join(methods) if methods else 'none'}), "
-                    f"{len(global_vars)} global variables ({', '.join(global_vars) if global_vars else 'none'}), "
-                    f"and {len(imports)} imported modules ({', '.join(imports) if imports else 'none'})."
-                )
+    Once both are done, a full rerun replaces the fragment with a static caption, which stops the polling.
+    """
+    if pipeline.settled:
+        st.rerun()
+    if pipeline.finished:
+        st.caption(f"✅ Background analysis complete. {model_status(pipeline)}")
+    else:
+        st.progress(pipeline.progress, text=f"{pipeline.status}. {model_status(pipeline)}")
 
-            if 'Java' in languages_detected:
-                java_analysis = analyze_java_project(project_path)
-                analysis.update({k: {'language': 'Java', **v} for k, v in java_analysis.items()})
-                classes = [c for v in java_analysis.values() for c in v["classes"]]
-                methods = [m for v in java_analysis.values() for m in v["methods"]]
-                imports = [i for v in java_analysis.values() for i in v["imports"]]
-                superclasses = [sc for v in java_analysis.values() for sc in v["superclass"]]
-                interfaces = [iface for v in java_analysis.values() for iface in v["interfaces"]]
-                context_parts.append(
-                    f"Java code with {len(classes)} classes ({', '.join(classes) if classes else 'none'}), "
-                    f"{len(methods)} methods ({', '.join(methods) if methods else 'none'}), "
-                    f"{len(imports)} imported packages ({', '.join(imports) if imports else 'none'}), "
-                    f"superclasses ({', '.join(superclasses) if superclasses else 'none'}), "
-                    f"and interfaces ({', '.join(interfaces) if interfaces else 'none'})."
-                )
+if uploaded_file is None and repo_path is None and "pipeline" in st.session_state:
+    st.session_state.pop("pipeline").cancel()
 
-            if 'JavaScript' in languages_detected:
-                javascript_analysis = analyze_javascript_project(project_path)
-                analysis.update({k: {'language': 'JavaScript', **v} for k, v in javascript_analysis.items()})
-                classes = [c for data in javascript_analysis.values() for c in data["classes"]]
-                functions = [f for data in javascript_analysis.values() for f in data["functions"]]
-                methods = [m for data in javascript_analysis.values() for m in data["methods"]]
-                imports = [i for data in javascript_analysis.values() for i in data["imports"]]
-                global_vars = [g for data in javascript_analysis.values() for g in data["global_vars"]]
-                context_parts.append(
-                    f"JavaScript code with {len(classes)} classes ({', '.join(classes) if classes else 'none'}), "
-                    f"{len(functions)} functions ({', '.join(functions) if functions else 'none'}), "
-                    f"{len(methods)} methods ({', '.join(methods) if methods else 'none'}), "
-                    f"{len(global_vars)} global variables ({', '.join(global_vars) if global_vars else 'none'}), "
-                    f"and {len(imports)} imported modules ({', '.join(imports) if imports else 'none'})."
-                )
+if uploaded_file is not None or repo_path is not None:
+    if uploaded_file is not None:
+        pipeline = get_upload_pipeline(uploaded_file)
+    else:
+        pipeline = get_git_pipeline(repo_path, revision)
+    languages_detected = pipeline.wait_for_languages()
+    if pipeline.error:
+        st.error(pipeline.error)
+        st.stop()
+    if pipeline.repo_path is not None:
+        st.success(f"Reading commit {pipeline.commit} from git repository: {pipeline.repo_path}")
+    else:
+        checkout = pipeline.checkout
+        st.success(f"ZIP file extracted to shared workspace: {pipeline.project_path}")
+        if checkout.reused:
+            st.caption(f"Same upload as before; reused its {checkout.files} extracted source files.")
+        else:
+            st.caption(f"Stored {checkout.new_files} new source files; "
+                       f"{checkout.files - checkout.new_files} were already in the workspace.")
 
-            if 'C' in languages_detected:
-                c_analysis = analyze_c_project(project_path)
-                analysis.update({k: {'language': 'C', **v} for k, v in c_analysis.items()})
-                structs = [s for data in c_analysis.values() for s in data["structs"]]
-                functions = [f for data in c_analysis.values() for f in data["functions"]]
-                includes = [i for data in c_analysis.values() for i in data["includes"]]
-                global_vars = [g for data in c_analysis.values() for g in data["global_vars"]]
-                context_parts.append(
-                    f"C code with {len(structs)} structs ({', '.join(structs) if structs else 'none'}), "
-                    f"{len(functions)} functions ({', '.join(functions) if functions else 'none'}), "
-                    f"{len(global_vars)} global variables ({', '.join(global_vars) if global_vars else 'none'}), "
-                    f"and {len(includes)} included files ({', '.join(includes) if includes else 'none'})."
-                )
+    if not languages_detected:
+        st.error("No supported source files (.py, .java, .js, .c, .h, .php) found in the project.")
+        st.stop()
 
-            if 'PHP' in languages_detected:
-                php_analysis = analyze_php_project(project_path)
-                analysis.update({k: {'language': 'PHP', **v} for k, v in php_analysis.items()})
-                classes = [c for data in php_analysis.values() for c in data["classes"]]
-                functions = [f for data in php_analysis.values() for f in data["functions"]]
-                methods = [m for data in php_analysis.values() for m in data["methods"]]
-                uses = [u for data in php_analysis.values() for u in data["uses"]]
-                parent_classes = [pc for data in php_analysis.values() for pc in data["parent_classes"]]
-                interfaces = [iface for data in php_analysis.values() for iface in data["interfaces"]]
-                traits = [trait for data in php_analysis.values() for trait in data["traits"]]
-                context_parts.append(
-                    f"PHP code with {len(classes)} classes ({', '.join(classes) if classes else 'none'}), "
-                    f"{len(functions)} functions ({', '.join(functions) if functions else 'none'}), "
-                    f"{len(methods)} methods ({', '.join(methods) if methods else 'none'}), "
-                    f"{len(uses)} imported namespaces ({', '.join(uses) if uses else 'none'}), "
-                    f"parent classes ({', '.join(parent_classes) if parent_classes else 'none'}), "
-                    f"interfaces ({', '.join(interfaces) if interfaces else 'none'}), "
-                    f"and traits ({', '.join(traits) if traits else 'none'})."
-                )
+    st.info(f"Detected languages: {', '.join(languages_detected)}")
+    show_pipeline_status(pipeline)
 
-            context = "Project contains: " + " ".join(context_parts) + " This is a multi-language project with the uploaded code structure."
+    query = st.text_input(
+        "Ask a question (e.g., classes, structs, traits, how many functions, list methods, what does code do, how many libraries):")
 
-            # Handle class/struct queries
-            class_count_match = re.search(r'\b(how\s+many|count|number\s+of)\b.*\b(class|classes|struct|structs)\b', q)
-            class_list_match = re.search(r'\b(name|list|show|what|which|all)\b.*\b(class|classes|struct|structs)\b',
-                                         q) or q in ["classes", "structs"] or "name them" in q or "present in project" in q
-            if class_count_match or class_list_match:
-                python_classes = [c for data in python_analysis.values() for c in data.get("classes", [])]
-                java_classes = [c for data in java_analysis.values() for c in data.get("classes", [])]
-                js_classes = [c for data in javascript_analysis.values() for c in data.get("classes", [])]
-                c_structs = [s for data in c_analysis.values() for s in data.get("structs", [])]
-                php_classes = [c for data in php_analysis.values() for c in data.get("classes", [])]
-                all_structures = (
-                    [f"Python: {c}" for c in python_classes] +
-                    [f"Java: {c}" for c in java_classes] +
-                    [f"JavaScript: {c}" for c in js_classes] +
-                    [f"C: {s}" for s in c_structs] +
-                    [f"PHP: {c}" for c in php_classes]
-                )
-                count = len(all_structures)
-                if class_count_match:
-                    st.write(f"Total classes/structs: {count}")
-                if class_list_match and all_structures:
-                    st.write("Classes/Structs:\n" + "\n".join(all_structures))
-                elif class_list_match:
-                    st.write("No classes or structs found.")
-            # Handle superclass/parent class queries (Java and PHP)
-            elif re.search(r'\b(how\s+many|count|number\s+of)\b.*\b(superclass|superclasses|parent\s+class|parent\s+classes)\b', q):
-                if 'Java' in languages_detected or 'PHP' in languages_detected:
-                    java_superclasses = [sc for data in java_analysis.values() for sc in data.get("superclass", [])]
-                    php_parent_classes = [pc for data in php_analysis.values() for pc in data.get("parent_classes", [])]
-                    count = len([sc for sc in java_superclasses if "has no superclass" not in sc]) + \
-                            len([pc for pc in php_parent_classes if "has no parent class" not in pc])
-                    st.write(f"Total superclasses/parent classes (Java/PHP): {count}")
-                else:
-                    st.write("Superclass/parent class queries are only supported for Java and PHP code, which were not detected.")
-            elif re.search(r'\b(name|list|show|what|which|all)\b.*\b(superclass|superclasses|parent\s+class|parent\s+classes)\b', q) or q in ["superclasses", "parent classes"]:
-                if 'Java' in languages_detected or 'PHP' in languages_detected:
-                    java_superclasses = [sc for data in java_analysis.values() for sc in data.get("superclass", [])]
-                    php_parent_classes = [pc for data in php_analysis.values() for pc in data.get("parent_classes", [])]
-                    all_parents = [sc for sc in java_superclasses if "has no superclass" not in sc] + \
-                                  [pc for pc in php_parent_classes if "has no parent class" not in pc]
-                    if all_parents:
-                        st.write("Superclasses/Parent Classes (Java/PHP):\n" + "\n".join(all_parents))
-                    else:
-                        st.write("No superclasses or parent classes found.")
-                else:
-                    st.write("Superclass/parent class queries are only supported for Java and PHP code, which were not detected.")
-            # Handle interface queries (Java and PHP)
-            elif re.search(r'\b(how\s+many|count|number\s+of)\b.*\b(interface|interfaces)\b', q):
-                if 'Java' in languages_detected or 'PHP' in languages_detected:
-                    java_interfaces = [iface for data in java_analysis.values() for iface in data.get("interfaces", [])]
-                    php_interfaces = [iface for data in php_analysis.values() for iface in data.get("interfaces", [])]
-                    count = len([iface for iface in java_interfaces if "implements no interfaces" not in iface]) + \
-                            len([iface for iface in php_interfaces if "implements no interfaces" not in iface])
-                    st.write(f"Total interfaces (Java/PHP): {count}")
-                else:
-                    st.write("Interface queries are only supported for Java and PHP code, which were not detected.")
-            elif re.search(r'\b(name|list|show|what|which|all)\b.*\b(interface|interfaces)\b', q) or q == "interfaces":
-                if 'Java' in languages_detected or 'PHP' in languages_detected:
-                    java_interfaces = [iface for data in java_analysis.values() for iface in data.get("interfaces", [])]
-                    php_interfaces = [iface for data in php_analysis.values() for iface in data.get("interfaces", [])]
-                    all_interfaces = [iface for iface in java_interfaces if "implements no interfaces" not in iface] + \
-                                     [iface for iface in php_interfaces if "implements no interfaces" not in iface]
-                    if all_interfaces:
-                        st.write("Interfaces (Java/PHP):\n" + "\n".join(all_interfaces))
-                    else:
-                        st.write("No interfaces found.")
-                else:
-                    st.write("Interface queries are only supported for Java and PHP code, which were not detected.")
-            # Handle trait queries (PHP only)
-            elif re.search(r'\b(how\s+many|count|number\s+of)\b.*\b(trait|traits)\b', q):
-                if 'PHP' in languages_detected:
-                    traits = [trait for data in php_analysis.values() for trait in data.get("traits", [])]
-                    count = len([trait for trait in traits if "uses no traits" not in trait])
-                    st.write(f"Total traits (PHP): {count}")
-                else:
-                    st.write("Trait queries are only supported for PHP code, which was not detected.")
-            elif re.search(r'\b(name|list|show|what|which|all)\b.*\b(trait|traits)\b', q) or q == "traits":
-                if 'PHP' in languages_detected:
-                    traits = [trait for data in php_analysis.values() for trait in data.get("traits", [])]
-                    if traits:
-                        st.write("Traits (PHP):\n" + "\n".join([trait for trait in traits if "uses no traits" not in trait]))
-                    else:
-                        st.write("No traits found.")
-                else:
-                    st.write("Trait queries are only supported for PHP code, which was not detected.")
-            # Handle library/module/include/use queries
-            elif re.search(r'\b(how\s+many|count|number\s+of)\b.*\b(librar(y|ies)|module|modules|package|packages|include|includes|use|uses)\b', q):
-                imports = (
-                    [i for data in python_analysis.values() for i in data.get("imports", [])] +
-                    [i for data in java_analysis.values() for i in data.get("imports", [])] +
-                    [i for data in javascript_analysis.values() for i in data.get("imports", [])] +
-                    [i for data in c_analysis.values() for i in data.get("includes", [])] +
-                    [u for data in php_analysis.values() for u in data.get("uses", [])]
-                )
-                unique_imports = sorted(set(imports))
-                st.write(f"Total modules/packages/includes/uses: {len(unique_imports)}")
-            elif re.search(r'\b(name|list|show|what|which|all)\b.*\b(librar(y|ies)|module|modules|package|packages|include|includes|use|uses)\b', q) or "name them" in q:
-                imports = (
-                    [f"Python: {i}" for data in python_analysis.values() for i in data.get("imports", [])] +
-                    [f"Java: {i}" for data in java_analysis.values() for i in data.get("imports", [])] +
-                    [f"JavaScript: {i}" for data in javascript_analysis.values() for i in data.get("imports", [])] +
-                    [f"C: {i}" for data in c_analysis.values() for i in data.get("includes", [])] +
-                    [f"PHP: {u}" for data in php_analysis.values() for u in data.get("uses", [])]
-                )
-                unique_imports = sorted(set(imports))
-                if unique_imports:
-                    st.write("Modules/Packages/Includes/Uses:\n" + "\n".join(unique_imports))
+    if query:
+        q = query.lower().strip()
+        project_path = pipeline.project_path
+
+        # Reuse the analysis computed in the background as soon as the upload arrived
+        with st.spinner("Analyzing project..."):
+            project = pipeline.wait_for_analysis()
+        if project is None:
+            st.error(pipeline.error or "Analysis was cancelled. Please upload the project again.")
+            st.stop()
+        analysis = project['analysis']
+        python_analysis = project['per_language'].get('Python', {})
+        java_analysis = project['per_language'].get('Java', {})
+        javascript_analysis = project['per_language'].get('JavaScript', {})
+        c_analysis = project['per_language'].get('C', {})
+        php_analysis = project['per_language'].get('PHP', {})
+        context = project['context']
+        if 'parsed' in project:
+            st.caption(f"Parsed {project['parsed']} new or changed files; reused {project['reused']} cached results by blob SHA.")
+        if project['errors']:
+            with st.expander(f"⚠️ {len(project['errors'])} files could not be analyzed and were skipped"):
+                st.dataframe([{**error, 'file': os.path.relpath(error['file'], project_path)} for error in project['errors']],
+                             hide_index=True)
+        if project['slow_files']:
+            with st.expander(f"🐢 {len(project['slow_files'])} files took longer than {SLOW_FILE_SECONDS:g}s to analyze"):
+                st.dataframe([{**slow, 'file': os.path.relpath(slow['file'], project_path)} for slow in project['slow_files']],
+                             hide_index=True)
+
+        def show_degraded(reason):
+            st.warning(f"⚡ Degraded answer: {reason}. This is a fast extractive summary of the analysis, not an LLM answer.")
+
+        # Complexity metrics are collected and stored as arrays during the analysis pass above
+        project_metrics = project['metrics']
+        top_n_match = re.search(r'\btop\s+(\d+)\b', q)
+        top_n = int(top_n_match.group(1)) if top_n_match else 10
+
+        # Handle class/struct queries
+        class_count_match = re.search(r'\b(how\s+many|count|number\s+of)\b.*\b(class|classes|struct|structs)\b', q)
+        class_list_match = re.search(r'\b(name|list|show|what|which|all)\b.*\b(class|classes|struct|structs)\b',
+                                     q) or q in ["classes", "structs"] or "name them" in q or "present in project" in q
+        # Handle duplicate code queries
+        if re.search(r'\b(duplicat(e|es|ed|ion)|clones?|copy[\s-]?past(e|ed))\b', q):
+            clusters = project['clone_clusters']
+            if clusters:
+                st.subheader("🧬 Duplicate Code")
+                st.write(f"Found {len(clusters)} clone clusters covering "
+                         f"{sum(len(c['members']) for c in clusters)} functions.")
+                for number, cluster in enumerate(clusters[:top_n], start=1):
+                    st.write(f"Cluster {number}: {len(cluster['members'])} functions, "
+                             f"~{cluster['similarity']:.0%} similar, {cluster['duplicated_loc']} duplicated lines")
+                    st.table(cluster['members'])
+            else:
+                st.write("No duplicate code found.")
+        # Handle complexity hotspot queries
+        elif re.search(r'\b(complex|complexity|hotspots?)\b.*\b(director(y|ies)|folders?|packages?)\b', q):
+            rows = directory_aggregates(project_metrics, project_path)
+            if rows:
+                st.subheader("📁 Complexity by Directory")
+                st.table(rows[:top_n])
+            else:
+                st.write("No functions or methods found.")
+        elif re.search(r'\b(most\s+complex|complexity|hotspots?|deep(est|ly)\s+nested|most\s+parameters)\b', q):
+            if 'nest' in q:
+                field = 'nesting'
+            elif 'parameter' in q:
+                field = 'params'
+            else:
+                field = 'complexity'
+            top = top_functions(project_metrics, field, top_n)
+            if top.size:
+                percentiles = metric_percentiles(project_metrics, field)
+                st.subheader("🔥 Complexity Hotspots")
+                st.write(f"{field.capitalize()} percentiles: " + ", ".join(f"p{p}={v:.1f}" for p, v in percentiles.items()))
+                st.table([
+                    {
+                        'function': project_metrics['names'][i],
+                        'language': project_metrics['file_language'][project_metrics['file_index'][i]],
+                        'file': os.path.relpath(project_metrics['files'][project_metrics['file_index'][i]], project_path),
+                        'line': int(project_metrics['line'][i]),
+                        'complexity': int(project_metrics['complexity'][i]),
+                        'nesting': int(project_metrics['nesting'][i]),
+                        'loc': int(project_metrics['loc'][i]),
+                        'params': int(project_metrics['params'][i]),
+                    }
+                    for i in top
+                ])
+            else:
+                st.write("No functions or methods found.")
+        elif re.search(r'\b(largest|biggest|longest)\b.*\bfiles?\b', q):
+            top = largest_files(project_metrics, top_n)
+            st.subheader("📄 Largest Files")
+            st.table([
+                {
+                    'file': os.path.relpath(project_metrics['files'][i], project_path),
+                    'language': project_metrics['file_language'][i],
+                    'loc': int(project_metrics['file_loc'][i]),
+                }
+                for i in top
+            ])
+        elif class_count_match or class_list_match:
+            structures = element_listing(analysis, ("classes", "structs"), project_path)
+            count = structures.count()
+            if class_count_match:
+                st.write(f"Total classes/structs: {count}")
+            if class_list_match and count:
+                st.write("Classes/Structs:")
+                show_listing(structures, "classes", languages_detected)
+            elif class_list_match:
+                st.write("No classes or structs found.")
+        # Handle superclass/parent class queries (Java and PHP)
+        elif re.search(r'\b(how\s+many|count|number\s+of)\b.*\b(superclass|superclasses|parent\s+class|parent\s+classes)\b', q):
+            if 'Java' in languages_detected or 'PHP' in languages_detected:
+                java_superclasses = [sc for data in java_analysis.values() for sc in data.get("superclass", [])]
+                php_parent_classes = [pc for data in php_analysis.values() for pc in data.get("parent_classes", [])]
+                count = len([sc for sc in java_superclasses if "has no superclass" not in sc]) + \
+                        len([pc for pc in php_parent_classes if "has no parent class" not in pc])
+                st.write(f"Total superclasses/parent classes (Java/PHP): {count}")
+            else:
+                st.write("Superclass/parent class queries are only supported for Java and PHP code, which were not detected.")
+        elif re.search(r'\b(name|list|show|what|which|all)\b.*\b(superclass|superclasses|parent\s+class|parent\s+classes)\b', q) or q in ["superclasses", "parent classes"]:
+            if 'Java' in languages_detected or 'PHP' in languages_detected:
+                parents = element_listing(
+                    analysis, ("superclass", "parent_classes"), project_path,
+                    skip=lambda name: "has no superclass" in name or "has no parent class" in name)
+                if parents.count():
+                    st.write("Superclasses/Parent Classes (Java/PHP):")
+                    show_listing(parents, "superclasses", languages_detected)
                 else:
-                    st.write("No modules, packages, includes, or uses found.")
-            # Handle methods/functions
-            elif re.search(r'\b(how\s+many|count|number\s+of)\b.*\b(function|functions|method|methods)\b', q):
-                function_count = (
-                    sum(len(data["functions"]) for data in python_analysis.values()) +
-                    sum(len(data["functions"]) for data in javascript_analysis.values()) +
-                    sum(len(data["functions"]) for data in c_analysis.values()) +
-                    sum(len(data["functions"]) for data in php_analysis.values())
-                )
-                method_count = (
-                    sum(len(data["methods"]) for data in python_analysis.values()) +
-                    sum(len(data["methods"]) for data in java_analysis.values()) +
-                    sum(len(data["methods"]) for data in javascript_analysis.values()) +
-                    sum(len(data["methods"]) for data in php_analysis.values())
-                )
-                if function_count > 0:
-                    st.write(f"Total functions (Python/JavaScript/C/PHP): {function_count}")
-                if method_count > 0:
-                    st.write(f"Total methods (Python/Java/JavaScript/PHP): {method_count}")
-                if function_count == 0 and method_count == 0:
-                    st.write("No functions or methods found.")
-            elif re.search(r'\b(name|list|show|what|which|all)?\b.*\b(function|functions|method|methods)\b', q) or q in ["methods", "functions"]:
-                functions = (
-                    [f"Python: {f}" for data in python_analysis.values() for f in data.get("functions", [])] +
-                    [f"JavaScript: {f}" for data in javascript_analysis.values() for f in data.get("functions", [])] +
-                    [f"C: {f}" for data in c_analysis.values() for f in data.get("functions", [])] +
-                    [f"PHP: {f}" for data in php_analysis.values() for f in data.get("functions", [])]
-                )
-                methods = (
-                    [f"Python: {m}" for data in python_analysis.values() for m in data.get("methods", [])] +
-                    [f"Java: {m}" for data in java_analysis.values() for m in data.get("methods", [])] +
-                    [f"JavaScript: {m}" for data in javascript_analysis.values() for m in data.get("methods", [])] +
-                    [f"PHP: {m}" for data in php_analysis.values() for m in data.get("methods", [])]
-                )
-                if functions or methods:
-                    if functions:
-                        st.write(f"Total functions: {len(functions)}")
-                        st.write("Functions:\n" + ", ".join(functions))
-                    if methods:
-                        st.write(f"Total methods: {len(methods)}")
-                        st.write("Methods:\n" + ", ".join(methods))
+                    st.write("No superclasses or parent classes found.")
+            else:
+                st.write("Superclass/parent class queries are only supported for Java and PHP code, which were not detected.")
+        # Handle interface queries (Java and PHP)
+        elif re.search(r'\b(how\s+many|count|number\s+of)\b.*\b(interface|interfaces)\b', q):
+            if 'Java' in languages_detected or 'PHP' in languages_detected:
+                java_interfaces = [iface for data in java_analysis.values() for iface in data.get("interfaces", [])]
+                php_interfaces = [iface for data in php_analysis.values() for iface in data.get("interfaces", [])]
+                count = len([iface for iface in java_interfaces if "implements no interfaces" not in iface]) + \
+                        len([iface for iface in php_interfaces if "implements no interfaces" not in iface])
+                st.write(f"Total interfaces (Java/PHP): {count}")
+            else:
+                st.write("Interface queries are only supported for Java and PHP code, which were not detected.")
+        elif re.search(r'\b(name|list|show|what|which|all)\b.*\b(interface|interfaces)\b', q) or q == "interfaces":
+            if 'Java' in languages_detected or 'PHP' in languages_detected:
+                interfaces = element_listing(analysis, ("interfaces",), project_path,
+                                             skip=lambda name: "implements no interfaces" in name)
+                if interfaces.count():
+                    st.write("Interfaces (Java/PHP):")
+                    show_listing(interfaces, "interfaces", languages_detected)
                 else:
-                    st.write("No functions or methods found.")
-            # Handle global variables (Python, JavaScript, and C)
-            elif re.search(r'\b(how\s+many|count|number\s+of)\b.*\b(global|globals|global\s+variables)\b', q):
-                global_vars = (
-                    [g for data in python_analysis.values() for g in data.get("global_vars", [])] +
-                    [g for data in javascript_analysis.values() for g in data.get("global_vars", [])] +
-                    [g for data in c_analysis.values() for g in data.get("global_vars", [])]
-                )
-                st.write(f"Total global variables (Python/JavaScript/C): {len(global_vars)}")
-            elif re.search(r'\b(name|list|show|what|which|all)\b.*\b(global|globals|global\s+variables)\b', q) or q == "global variables":
-                global_vars = (
-                    [f"Python: {g}" for data in python_analysis.values() for g in data.get("global_vars", [])] +
-                    [f"JavaScript: {g}" for data in javascript_analysis.values() for g in data.get("global_vars", [])] +
-                    [f"C: {g}" for data in c_analysis.values() for g in data.get("global_vars", [])]
-                )
-                if global_vars:
-                    st.write("Global Variables:\n" + "\n".join(global_vars))
+                    st.write("No interfaces found.")
+            else:
+                st.write("Interface queries are only supported for Java and PHP code, which were not detected.")
+        # Handle trait queries (PHP only)
+        elif re.search(r'\b(how\s+many|count|number\s+of)\b.*\b(trait|traits)\b', q):
+            if 'PHP' in languages_detected:
+                traits = [trait for data in php_analysis.values() for trait in data.get("traits", [])]
+                count = len([trait for trait in traits if "uses no traits" not in trait])
+                st.write(f"Total traits (PHP): {count}")
+            else:
+                st.write("Trait queries are only supported for PHP code, which was not detected.")
+        elif re.search(r'\b(name|list|show|what|which|all)\b.*\b(trait|traits)\b', q) or q == "traits":
+            if 'PHP' in languages_detected:
+                traits = element_listing(analysis, ("traits",), project_path,
+                                     skip=lambda name: "uses no traits" in name)
+                if traits.count():
+                    st.write("Traits (PHP):")
+                    show_listing(traits, "traits", languages_detected)
                 else:
-                    st.write("No global variables found.")
-            # Handle explanation queries
-            elif re.search(r'\b(explain|describe|what|about|summary)\b.*\b(code|project|it|does|functionality|purpose)?\b', q) or q in ["explain", "what code describes", "describe code"]:
-                purpose_parts = []
-                base_explanations = []
-                if 'Python' in languages_detected:
-                    base_explanations.append(explain_python_code(project_path))
-                    purpose_parts.append("The Python portion is a code analysis tool that parses Python source files to extract structural elements like classes, functions, methods, and global variables using the `ast` module.")
-                if 'Java' in languages_detected:
-                    base_explanations.append(explain_java_code(project_path))
-                    purpose_parts.append("The Java portion is designed to manage its specific functionality based on the uploaded code.")
-                if 'JavaScript' in languages_detected:
-                    base_explanations.append(explain_javascript_code(project_path))
-                    purpose_parts.append("The JavaScript portion is designed to manage its specific functionality based on the uploaded code.")
-                if 'C' in languages_detected:
-                    base_explanations.append(explain_c_code(project_path))
-                    purpose_parts.append("The C portion is designed to manage its specific functionality based on the uploaded code.")
-                if 'PHP' in languages_detected:
-                    base_explanations.append(explain_php_code(project_path))
-                    purpose_parts.append("The PHP portion is designed to manage its specific functionality based on the uploaded code.")
-                purpose = " ".join(purpose_parts)
-                base_explanation = "\n".join(base_explanations)
-                prompt = f"{context}\n\nStructural analysis:\n{base_explanation}\n\nQuery: {query} [Unique ID: {uuid.uuid4()}]\n\nProvide a clear, concise explanation addressing the query, using the context and analysis. Focus on the project's functionality and purpose."
-                response = query_ollama(prompt)
-                st.subheader("📝 Project Explanation")
-                st.markdown(f"{purpose}\n\n{response}")
-            # Show extracted elements
-            elif "show extracted elements" in q or "extracted elements" in q:
-                st.subheader("📋 Extracted Elements")
-                st.json(analysis)
-            # Fallback to Ollama
+                    st.write("No traits found.")
+            else:
+                st.write("Trait queries are only supported for PHP code, which was not detected.")
+        # Handle library/module/include/use queries
+        elif re.search(r'\b(how\s+many|count|number\s+of)\b.*\b(librar(y|ies)|module|modules|package|packages|include|includes|use|uses)\b', q):
+            st.write(f"Total modules/packages/includes/uses: {module_listing(analysis, project_path).count()}")
+        elif re.search(r'\b(name|list|show|what|which|all)\b.*\b(librar(y|ies)|module|modules|package|packages|include|includes|use|uses)\b', q) or "name them" in q:
+            imports = module_listing(analysis, project_path)
+            if imports.count():
+                st.write("Modules/Packages/Includes/Uses:")
+                show_listing(imports.sort_by("name"), "modules", languages_detected)
+            else:
+                st.write("No modules, packages, includes, or uses found.")
+        # Handle methods/functions
+        elif re.search(r'\b(how\s+many|count|number\s+of)\b.*\b(function|functions|method|methods)\b', q):
+            function_count = (
+                sum(len(data["functions"]) for data in python_analysis.values()) +
+                sum(len(data["functions"]) for data in javascript_analysis.values()) +
+                sum(len(data["functions"]) for data in c_analysis.values()) +
+                sum(len(data["functions"]) for data in php_analysis.values())
+            )
+            method_count = (
+                sum(len(data["methods"]) for data in python_analysis.values()) +
+                sum(len(data["methods"]) for data in java_analysis.values()) +
+                sum(len(data["methods"]) for data in javascript_analysis.values()) +
+                sum(len(data["methods"]) for data in php_analysis.values())
+            )
+            if function_count > 0:
+                st.write(f"Total functions (Python/JavaScript/C/PHP): {function_count}")
+            if method_count > 0:
+                st.write(f"Total methods (Python/Java/JavaScript/PHP): {method_count}")
+            if function_count == 0 and method_count == 0:
+                st.write("No functions or methods found.")
+        elif re.search(r'\b(name|list|show|what|which|all)?\b.*\b(function|functions|method|methods)\b', q) or q in ["methods", "functions"]:
+            callables = element_listing(analysis, ("functions", "methods"), project_path)
+            kinds = dict(callables.group_counts("kind"))
+            if kinds:
+                if kinds.get("functions"):
+                    st.write(f"Total functions: {kinds['functions']}")
+                if kinds.get("methods"):
+                    st.write(f"Total methods: {kinds['methods']}")
+                show_listing(callables, "functions", languages_detected)
+            else:
+                st.write("No functions or methods found.")
+        # Handle global variables (Python, JavaScript, and C)
+        elif re.search(r'\b(how\s+many|count|number\s+of)\b.*\b(global|globals|global\s+variables)\b', q):
+            global_vars = (
+                [g for data in python_analysis.values() for g in data.get("global_vars", [])] +
+                [g for data in javascript_analysis.values() for g in data.get("global_vars", [])] +
+                [g for data in c_analysis.values() for g in data.get("global_vars", [])]
+            )
+            st.write(f"Total global variables (Python/JavaScript/C): {len(global_vars)}")
+        elif re.search(r'\b(name|list|show|what|which|all)\b.*\b(global|globals|global\s+variables)\b', q) or q == "global variables":
+            global_vars = element_listing(analysis, ("global_vars",), project_path)
+            if global_vars.count():
+                st.write("Global Variables:")
+                show_listing(global_vars, "globals", languages_detected)
+            else:
+                st.write("No global variables found.")
+        # Handle explanation queries
+        elif re.search(r'\b(explain|describe|what|about|summary)\b.*\b(code|project|it|does|functionality|purpose)?\b', q) or q in ["explain", "what code describes", "describe code"]:
+            degraded_reason = None
+            if q.rstrip("?.!") in EXPLAIN_QUERIES and pipeline.explanation is not None:
+                # Generated speculatively in the background right after upload
+                response = pipeline.explanation
+            else:
+                prompt = build_explain_prompt(context, project['explanation'], query)
+                response, degraded_reason = query_ollama_or_fallback(
+                    prompt, lambda: extractive_summary(project, project_path, query))
+            st.subheader("📝 Project Explanation")
+            if degraded_reason:
+                show_degraded(degraded_reason)
+            st.markdown(f"{project['purpose']}\n\n{response}")
+        # Show extracted elements
+        elif "show extracted elements" in q or "extracted elements" in q:
+            st.subheader("📋 Extracted Elements")
+            rows = show_listing(file_listing(analysis, project_path), "extracted_elements", languages_detected)
+            # Only the files on the visible page are serialized in full
+            st.json({row['file']: {key: value for key, value in analysis[os.path.join(project_path, row['file'])].items()
+                                   if key != 'clone_shingles'} for row in rows})
+        # Fallback to Ollama
+        else:
+            prompt = f"{context}\n\nQuery: {query} [Unique ID: {uuid.uuid4()}]\n\nAnswer the query based on the project context. If it’s about code structure, summarize classes, structs, methods, functions, superclasses, interfaces, traits, includes, or imports. If it’s unclear, ask for clarification."
+            response, degraded_reason = query_ollama_or_fallback(
+                prompt, lambda: extractive_summary(project, project_path, query))
+            if degraded_reason:
+                show_degraded(degraded_reason)
+                st.markdown(response)
             else:
-                prompt = f"{context}\n\nQuery: {query} [Unique ID: {uuid.uuid4()}]\n\nAnswer the query based on the project context. If it’s about code structure, summarize classes, structs, methods, functions, superclasses, interfaces, traits, includes, or imports. If it’s unclear, ask for clarification."
-                response = query_ollama(prompt)
                 st.write(f"Ollama Response: {response}")
 else:
-    st.info("Please upload a ZIP file containing your project.")
\ No newline at end of file
+    st.info("Please upload a ZIP file containing your project or enter the path of a local git repository.")
\ No newline at end of file
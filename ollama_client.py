@@ -0,0 +1,114 @@
+import threading
+import time
+import requests
+
+# Ollama configuration
+OLLAMA_URL = "http://localhost:11434/api/generate"
+OLLAMA_MODEL = "codellama:7b"
+OLLAMA_KEEP_ALIVE = "30m"  # How long Ollama keeps the model loaded after a request
+
+# Thresholds for switching to the extractive fast path
+MAX_QUEUE_DEPTH = 2           # Requests already in flight from this server before new ones degrade
+LATENCY_THRESHOLD = 20.0      # Seconds; smoothed latency of recent requests above this degrades
+CONNECT_TIMEOUT = 3.0         # Seconds to reach the Ollama server
+ANSWER_TIMEOUT = LATENCY_THRESHOLD  # Seconds an interactive answer may take; slower ones degrade
+UNAVAILABLE_COOLDOWN = 30.0   # Seconds to skip Ollama after a failed or timed-out request
+LATENCY_SMOOTHING = 0.3       # Weight of the newest sample in the latency moving average
+LATENCY_WINDOW = 120.0        # Seconds after which a latency measurement no longer counts
+
+_load_lock = threading.Lock()
+_load = {"in_flight": 0, "latency": None, "latency_at": 0.0, "unavailable_until": 0.0}
+
+
+def generate(prompt, timeout=None):
+    """Send a prompt to Ollama and return the response text; raises on HTTP/connection errors.
+
+    Every call is counted towards the queue depth and latency used by llm_saturated().
+    """
+    with _load_lock:
+        _load["in_flight"] += 1
+    started = time.monotonic()
+    failed = True
+    try:
+        response = requests.post(
+            OLLAMA_URL,
+            json={
+                "model": OLLAMA_MODEL,
+                "prompt": prompt,
+                "stream": False,
+                "keep_alive": OLLAMA_KEEP_ALIVE,
+                "options": {"temperature": 0.3}
+            },
+            timeout=timeout
+        )
+        response.raise_for_status()
+        failed = False
+        return response.json().get("response", "Error: No response from Ollama")
+    finally:
+        elapsed = time.monotonic() - started
+        with _load_lock:
+            _load["in_flight"] -= 1
+            if failed:
+                _load["unavailable_until"] = time.monotonic() + UNAVAILABLE_COOLDOWN
+            else:
+                if _load["latency"] is None or time.monotonic() - _load["latency_at"] > LATENCY_WINDOW:
+                    _load["latency"] = elapsed
+                else:
+                    _load["latency"] += LATENCY_SMOOTHING * (elapsed - _load["latency"])
+                _load["latency_at"] = time.monotonic()
+
+
+def llm_saturated():
+    """Return a reason string if Ollama should be bypassed right now, else None."""
+    with _load_lock:
+        in_flight = _load["in_flight"]
+        latency = _load["latency"]
+        latency_at = _load["latency_at"]
+        unavailable_until = _load["unavailable_until"]
+    now = time.monotonic()
+    if now < unavailable_until:
+        return "Ollama failed or timed out recently"
+    if in_flight >= MAX_QUEUE_DEPTH:
+        return f"Ollama is busy with {in_flight} queued requests"
+    # A stale slow reading expires so the next question probes Ollama again
+    if latency is not None and now - latency_at <= LATENCY_WINDOW and latency > LATENCY_THRESHOLD:
+        return f"Ollama is responding slowly (~{latency:.0f}s per answer)"
+    return None
+
+
+def query_ollama_or_fallback(prompt, fallback):
+    """Answer with Ollama unless it is saturated, slow or down; otherwise answer with fallback().
+
+    Returns (answer, degraded_reason); degraded_reason is None when the answer came from the LLM.
+    """
+    reason = llm_saturated()
+    if reason is None:
+        try:
+            return generate(prompt, timeout=(CONNECT_TIMEOUT, ANSWER_TIMEOUT)), None
+        except requests.exceptions.Timeout:
+            reason = f"Ollama did not answer within {ANSWER_TIMEOUT:.0f}s"
+        except requests.exceptions.ConnectionError:
+            reason = "Ollama server not running at localhost:11434"
+        except requests.exceptions.RequestException as e:
+            reason = f"Ollama request failed ({str(e)})"
+    return fallback(), reason
+
+
+def warm_up_model(timeout=300):
+    """Load OLLAMA_MODEL into memory ahead of the first real question.
+
+    A generate request with an empty prompt only loads the model, and keep_alive keeps it resident.
+    Returns True if the model is loaded; a failure starts the same cooldown as a failed generate().
+    """
+    try:
+        response = requests.post(
+            OLLAMA_URL,
+            json={"model": OLLAMA_MODEL, "prompt": "", "keep_alive": OLLAMA_KEEP_ALIVE},
+            timeout=timeout
+        )
+        response.raise_for_status()
+        return True
+    except requests.exceptions.RequestException:
+        with _load_lock:
+            _load["unavailable_until"] = time.monotonic() + UNAVAILABLE_COOLDOWN
+        return False
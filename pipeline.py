@@ -0,0 +1,185 @@
+import threading
+import uuid
+import weakref
+import zipfile
+from subprocess import CalledProcessError
+from analyzer.project import detect_languages, analyze_project, list_git_sources, analyze_git_project
+from analyzer.git_source import BlobAnalysisCache
+from ollama_client import generate, warm_up_model, llm_saturated, CONNECT_TIMEOUT
+from workspace import UploadWorkspace
+
+# Queries answered by the speculatively generated project explanation
+EXPLAIN_QUERIES = {
+    "explain", "explain code", "explain the code", "explain project", "explain the project",
+    "describe code", "describe the code", "describe project", "describe the project",
+    "what code describes", "what does the code do", "what does this code do",
+    "what does the project do", "what does this project do", "summary", "summarize",
+}
+
+SPECULATIVE_EXPLAIN_QUERY = "Explain what this project does."
+SPECULATIVE_TIMEOUT = 300.0  # Seconds the background explanation may take
+
+
+def build_explain_prompt(context, base_explanation, query):
+    """Prompt used by the explain answer, both live and precomputed."""
+    return f"{context}\n\nStructural analysis:\n{base_explanation}\n\nQuery: {query} [Unique ID: {uuid.uuid4()}]\n\nProvide a clear, concise explanation addressing the query, using the context and analysis. Focus on the project's functionality and purpose."
+
+
+def release_checkouts(checkouts):
+    """Release every workspace checkout in the list."""
+    while checkouts:
+        checkouts.pop().release()
+
+
+class ProjectPipeline:
+    """Extracts, analyzes and pre-explains an uploaded project on a worker thread.
+
+    Started as soon as a ZIP is uploaded so parsing and the Ollama model load overlap with the
+    user typing a question. The ZIP is checked out of the shared `workspace`, which stores each
+    source file once across uploads and sessions; the checkout is held until cancel() is called
+    or the pipeline is garbage collected.
+
+    When repo_path is given instead of zip_bytes, the project is read from that local git
+    repository at `revision` through the object store, and per-file results are reused from
+    `cache` by blob SHA. Nothing is extracted and the repository is never modified.
+    """
+
+    def __init__(self, upload_key, zip_bytes=None, repo_path=None, revision="HEAD", cache=None, workspace=None):
+        self.upload_key = upload_key
+        self.repo_path = repo_path
+        self.revision = revision
+        self.commit = None
+        self._git_sources = None
+        self._cache = cache
+        self._workspace = workspace
+        self.checkout = None
+        self.project_path = repo_path
+        self._checkouts = []
+        self._cleanup = weakref.finalize(self, release_checkouts, self._checkouts)
+        self.status = "Queued"
+        self.progress = 0.0
+        self.error = None
+        self.languages = None
+        self.project = None
+        self.explanation = None
+        self.model_warm = None
+        self._zip_bytes = zip_bytes
+        self._cancelled = threading.Event()
+        self._languages_ready = threading.Event()
+        self._analysis_ready = threading.Event()
+        self._finished = threading.Event()
+        self._worker = threading.Thread(target=self._run, name=f"pipeline-{upload_key}", daemon=True)
+        self._warmer = threading.Thread(target=self._warm_model, name=f"warm-{upload_key}", daemon=True)
+
+    def start(self):
+        self._worker.start()
+        self._warmer.start()
+        return self
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def finished(self):
+        return self._finished.is_set()
+
+    @property
+    def settled(self):
+        """True once both the analysis worker and the model warm-up have finished."""
+        return self._finished.is_set() and not self._warmer.is_alive()
+
+    def cancel(self):
+        """Stop background work and delete the extracted project once the worker lets go of it."""
+        self._cancelled.set()
+        self._languages_ready.set()
+        self._analysis_ready.set()
+        if self._finished.is_set() or not self._worker.is_alive():
+            self._cleanup()
+
+    def wait_for_languages(self, timeout=None):
+        self._languages_ready.wait(timeout)
+        return self.languages
+
+    def wait_for_analysis(self, timeout=None):
+        self._analysis_ready.wait(timeout)
+        return self.project
+
+    def _set_status(self, status, progress):
+        self.status = status
+        self.progress = progress
+
+    def _warm_model(self):
+        self.model_warm = warm_up_model()
+
+    def _load_zip(self):
+        self._set_status("Extracting ZIP file", 0.05)
+        if self._workspace is None:
+            self._workspace = UploadWorkspace()
+        try:
+            self.checkout = self._workspace.checkout(self._zip_bytes)
+        except zipfile.BadZipFile:
+            self.error = "Invalid ZIP file. Please upload a valid ZIP file."
+            return
+        finally:
+            self._zip_bytes = None
+        self._checkouts.append(self.checkout)
+        self.project_path = self.checkout.path
+        self.languages = detect_languages(self.project_path)
+
+    def _load_git(self):
+        self._set_status(f"Reading {self.revision} from git", 0.05)
+        try:
+            self.commit, self._git_sources, self.languages = list_git_sources(self.repo_path, self.revision)
+        except (CalledProcessError, OSError) as e:
+            stderr = getattr(e, "stderr", None)
+            detail = stderr.decode(errors="replace").strip() if stderr else str(e)
+            self.error = f"Could not read revision `{self.revision}` from git repository {self.repo_path}: {detail}"
+
+    def _analyze(self, on_progress):
+        if self.repo_path is None:
+            return analyze_project(self.project_path, self.languages, on_progress, lambda: self.cancelled)
+        if self._cache is None:
+            self._cache = BlobAnalysisCache()
+        return analyze_git_project(self.repo_path, self._git_sources, self.languages, self._cache,
+                                   on_progress, lambda: self.cancelled)
+
+    def _run(self):
+        try:
+            if self.repo_path is None:
+                self._load_zip()
+            else:
+                self._load_git()
+            self._languages_ready.set()
+            if self.error or not self.languages or self.cancelled:
+                return
+
+            def on_progress(index, total, language):
+                self._set_status(f"Analyzing {language} files", 0.1 + 0.6 * index / max(total, 1))
+
+            self.project = self._analyze(on_progress)
+            self._analysis_ready.set()
+            if self.project is None:
+                return
+
+            if self.cancelled or llm_saturated():
+                # Do not add speculative load for a replaced upload or to a busy or unavailable Ollama
+                return
+            self._set_status("Preparing project explanation", 0.75)
+            prompt = build_explain_prompt(self.project['context'], self.project['explanation'], SPECULATIVE_EXPLAIN_QUERY)
+            try:
+                response = generate(prompt, timeout=(CONNECT_TIMEOUT, SPECULATIVE_TIMEOUT))
+            except Exception:
+                # Ollama is unavailable; the explain answer falls back to a live query
+                response = None
+            if response is not None and not self.cancelled:
+                self.explanation = response
+        except Exception as e:
+            self.error = f"Background analysis failed: {str(e)}"
+        finally:
+            self._languages_ready.set()
+            self._analysis_ready.set()
+            self._set_status("Ready" if self.error is None else "Failed", 1.0)
+            self._finished.set()
+            if self.cancelled:
+                self._cleanup()
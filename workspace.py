@@ -0,0 +1,277 @@
+import hashlib
+import io
+import os
+import shutil
+import socket
+import sqlite3
+import tempfile
+import time
+import uuid
+import zipfile
+from contextlib import contextmanager
+from analyzer.project import language_for_file
+
+DEFAULT_WORKSPACE_DIR = os.environ.get(
+    "CODE_ANALYZER_WORKSPACE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "code_analyzer", "workspace")
+)
+DEFAULT_QUOTA_BYTES = int(os.environ.get("CODE_ANALYZER_WORKSPACE_QUOTA", 2 * 1024 ** 3))
+COPY_CHUNK_BYTES = 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (sha TEXT PRIMARY KEY, size INTEGER NOT NULL, refs INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS manifests (
+    id TEXT PRIMARY KEY, files INTEGER NOT NULL, bytes INTEGER NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS entries (
+    manifest TEXT NOT NULL, path TEXT NOT NULL, sha TEXT NOT NULL, PRIMARY KEY (manifest, path));
+CREATE TABLE IF NOT EXISTS leases (
+    id TEXT PRIMARY KEY, manifest TEXT NOT NULL, host TEXT NOT NULL, pid INTEGER NOT NULL, acquired REAL NOT NULL);
+"""
+
+
+def member_path(name):
+    """Safe relative path for a ZIP member, dropping absolute and parent components like extractall does."""
+    parts = [part for part in name.replace("\\", "/").split("/") if part not in ("", ".", "..")]
+    return os.path.join(*parts) if parts else None
+
+
+def link_or_copy(source, target):
+    try:
+        os.link(source, target)
+    except OSError:
+        # Filesystems without hard links fall back to a private copy
+        shutil.copyfile(source, target)
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Checkout:
+    """A session's hold on an extracted upload; the files under `path` stay until release()."""
+
+    def __init__(self, workspace, lease_id, manifest_id, path, files, new_files, reused):
+        self.workspace = workspace
+        self.lease_id = lease_id
+        self.manifest_id = manifest_id
+        self.path = path
+        self.files = files
+        self.new_files = new_files
+        self.reused = reused
+
+    def release(self):
+        if self.lease_id is not None:
+            self.workspace.release(self.lease_id)
+            self.lease_id = None
+
+
+class UploadWorkspace:
+    """Content-addressed store for extracted uploads, shared by every session and server process.
+
+    Each source file is stored once under objects/ by SHA-256 and reference-counted by the upload
+    manifests that contain it. An upload is a manifest keyed by the ZIP's own hash plus a view
+    directory of hard links into the store, so uploading the same ZIP again extracts nothing and
+    overlapping uploads only add their new files. Manifests no session holds a lease on are kept
+    for reuse and evicted least recently used first once the stored bytes exceed quota_bytes.
+    """
+
+    def __init__(self, root=DEFAULT_WORKSPACE_DIR, quota_bytes=DEFAULT_QUOTA_BYTES):
+        self.root = root
+        self.quota_bytes = quota_bytes
+        self.objects_dir = os.path.join(root, "objects")
+        self.views_dir = os.path.join(root, "views")
+        self.tmp_dir = os.path.join(root, "tmp")
+        for directory in (self.objects_dir, self.views_dir, self.tmp_dir):
+            os.makedirs(directory, exist_ok=True)
+        self.index_path = os.path.join(root, "index.db")
+        conn = self._connect()
+        try:
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.index_path, timeout=60, isolation_level=None)
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def _object_path(self, sha):
+        return os.path.join(self.objects_dir, sha[:2], sha)
+
+    def view_path(self, manifest_id):
+        return os.path.join(self.views_dir, manifest_id)
+
+    def _lease(self, conn, manifest_id):
+        lease_id = uuid.uuid4().hex
+        now = time.time()
+        conn.execute("INSERT INTO leases (id, manifest, host, pid, acquired) VALUES (?, ?, ?, ?, ?)",
+                     (lease_id, manifest_id, socket.gethostname(), os.getpid(), now))
+        conn.execute("UPDATE manifests SET last_used = ? WHERE id = ?", (now, manifest_id))
+        return lease_id
+
+    def _store(self, source, view_file):
+        """Hash a member into a temporary file, link it into the view and add it to the store if new.
+
+        Returns (sha, size, new). The view is linked before the object is published, so its data
+        survives even if a concurrent eviction removes the object file.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=self.tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as temp:
+                for chunk in iter(lambda: source.read(COPY_CHUNK_BYTES), b""):
+                    digest.update(chunk)
+                    temp.write(chunk)
+                    size += len(chunk)
+            sha = digest.hexdigest()
+            object_path = self._object_path(sha)
+            os.makedirs(os.path.dirname(view_file), exist_ok=True)
+            if os.path.lexists(view_file):
+                os.remove(view_file)  # A later duplicate member wins, as with extractall
+            if os.path.exists(object_path):
+                try:
+                    link_or_copy(object_path, view_file)
+                    return sha, size, False
+                except FileNotFoundError:
+                    pass  # Evicted in the meantime; publish this copy instead
+            os.chmod(temp_path, 0o444)
+            link_or_copy(temp_path, view_file)
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            os.replace(temp_path, object_path)
+            return sha, size, True
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def checkout(self, zip_bytes):
+        """Return a Checkout of an uploaded ZIP, extracting only source files not already stored.
+
+        Raises zipfile.BadZipFile for invalid archives.
+        """
+        manifest_id = hashlib.sha256(zip_bytes).hexdigest()
+        view = self.view_path(manifest_id)
+        with self._transaction() as conn:
+            row = conn.execute("SELECT files FROM manifests WHERE id = ?", (manifest_id,)).fetchone()
+            if row is not None and os.path.isdir(view):
+                lease_id = self._lease(conn, manifest_id)
+                return Checkout(self, lease_id, manifest_id, view, row[0], 0, True)
+
+        staging = tempfile.mkdtemp(dir=self.tmp_dir, prefix="view-")
+        entries = {}
+        new_files = 0
+        try:
+            with zipfile.ZipFile(io.BytesIO(zip_bytes), "r") as zip_ref:
+                for info in zip_ref.infolist():
+                    path = member_path(info.filename)
+                    # Only the source files the analyzers read are stored
+                    if info.is_dir() or path is None or language_for_file(os.path.basename(path)) is None:
+                        continue
+                    with zip_ref.open(info) as source:
+                        sha, size, new = self._store(source, os.path.join(staging, path))
+                    entries[path] = (sha, size)
+                    new_files += new
+
+            with self._transaction() as conn:
+                row = conn.execute("SELECT files FROM manifests WHERE id = ?", (manifest_id,)).fetchone()
+                if row is not None and os.path.isdir(view):
+                    # Another session finished the same upload first
+                    lease_id = self._lease(conn, manifest_id)
+                    return Checkout(self, lease_id, manifest_id, view, row[0], 0, True)
+                if row is not None:
+                    self._drop_manifest(conn, manifest_id)
+                if os.path.lexists(view):
+                    shutil.rmtree(view, ignore_errors=True)
+                os.replace(staging, view)
+                now = time.time()
+                conn.execute("INSERT INTO manifests (id, files, bytes, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                             (manifest_id, len(entries), sum(size for _, size in entries.values()), now, now))
+                conn.executemany("INSERT INTO entries (manifest, path, sha) VALUES (?, ?, ?)",
+                                 [(manifest_id, path, sha) for path, (sha, _) in entries.items()])
+                conn.executemany("INSERT INTO objects (sha, size, refs) VALUES (?, ?, 1) "
+                                 "ON CONFLICT (sha) DO UPDATE SET refs = refs + 1",
+                                 list(entries.values()))
+                lease_id = self._lease(conn, manifest_id)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        self.evict()
+        return Checkout(self, lease_id, manifest_id, view, len(entries), new_files, False)
+
+    def release(self, lease_id):
+        """Drop a session's lease; the upload stays cached until it is evicted."""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM leases WHERE id = ?", (lease_id,))
+        self.evict()
+
+    def _drop_manifest(self, conn, manifest_id):
+        """Remove a manifest and its view, and delete objects no other manifest references."""
+        shas = [sha for (sha,) in conn.execute("SELECT sha FROM entries WHERE manifest = ?", (manifest_id,))]
+        conn.executemany("UPDATE objects SET refs = refs - 1 WHERE sha = ?", [(sha,) for sha in shas])
+        conn.execute("DELETE FROM entries WHERE manifest = ?", (manifest_id,))
+        conn.execute("DELETE FROM manifests WHERE id = ?", (manifest_id,))
+        freed = 0
+        for sha, size in conn.execute("SELECT sha, size FROM objects WHERE refs <= 0").fetchall():
+            try:
+                os.remove(self._object_path(sha))
+            except FileNotFoundError:
+                pass
+            freed += size
+        conn.execute("DELETE FROM objects WHERE refs <= 0")
+        shutil.rmtree(self.view_path(manifest_id), ignore_errors=True)
+        return freed
+
+    def evict(self):
+        """Evict least recently used, unleased uploads until the store fits the quota.
+
+        Leases held by processes on this host that no longer exist are dropped first. Returns the
+        evicted manifest ids.
+        """
+        evicted = []
+        with self._transaction() as conn:
+            host = socket.gethostname()
+            stale = [(lease_id,) for lease_id, pid in conn.execute(
+                "SELECT id, pid FROM leases WHERE host = ?", (host,)).fetchall() if not process_alive(pid)]
+            conn.executemany("DELETE FROM leases WHERE id = ?", stale)
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+            if total <= self.quota_bytes:
+                return evicted
+            candidates = conn.execute(
+                "SELECT id FROM manifests WHERE id NOT IN (SELECT manifest FROM leases) ORDER BY last_used").fetchall()
+            for (manifest_id,) in candidates:
+                if total <= self.quota_bytes:
+                    break
+                total -= self._drop_manifest(conn, manifest_id)
+                evicted.append(manifest_id)
+        return evicted
+
+    def usage(self):
+        """Return stored bytes and counts of objects, manifests and active leases."""
+        conn = self._connect()
+        try:
+            stored, objects = conn.execute("SELECT COALESCE(SUM(size), 0), COUNT(*) FROM objects").fetchone()
+            return {
+                'bytes': stored,
+                'objects': objects,
+                'manifests': conn.execute("SELECT COUNT(*) FROM manifests").fetchone()[0],
+                'leases': conn.execute("SELECT COUNT(*) FROM leases").fetchone()[0],
+                'quota_bytes': self.quota_bytes,
+            }
+        finally:
+            conn.close()